@@ -1,5 +1,9 @@
-from flask import Flask, render_template, request, jsonify, session
-from flask_socketio import SocketIO, emit
+import eventlet
+eventlet.monkey_patch()
+
+from flask import Flask, Response, render_template, request, session
+from flask.json.provider import DefaultJSONProvider
+from flask_socketio import SocketIO, emit, join_room, leave_room
 from flask_cors import CORS
 import threading
 import time
@@ -8,8 +12,10 @@ from typing import Optional, Dict, List
 import serial
 from serial.tools import list_ports
 from collections import deque
-# from queue import Queue, Empty
+from itertools import islice
+from queue import SimpleQueue, Empty
 import logging
+import orjson
 
 
 
@@ -23,20 +29,141 @@ from nation import NationReader
 # Load configuration
 config = get_config()
 
+# orjson: dict công suất antenna dùng key kiểu int → cần OPT_NON_STR_KEYS
+ORJSON_OPTS = orjson.OPT_NON_STR_KEYS
+
+class OrjsonProvider(DefaultJSONProvider):
+    """JSON provider của Flask (request.get_json, ...) dùng orjson"""
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, option=ORJSON_OPTS).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+class OrjsonSocketJSON:
+    """Module-like wrapper (dumps/loads) cho python-socketio"""
+    @staticmethod
+    def dumps(obj, _dumps=orjson.dumps, _opts=ORJSON_OPTS, **kwargs):
+        # orjson.dumps/option bind sẵn lúc định nghĩa → mỗi packet không phải tra global
+        return _dumps(obj, option=_opts).decode()
+
+    # python-socketio chỉ gọi loads(s) → dùng thẳng hàm C của orjson
+    loads = staticmethod(orjson.loads)
+
 app = Flask(__name__)
 app.config.from_object(config)
+app.json = OrjsonProvider(app)
 CORS(app)  
-socketio = SocketIO(app, cors_allowed_origins="*", async_mode='threading', logger=False, engineio_logger=True)
+socketio = SocketIO(app, cors_allowed_origins=config.SOCKETIO_CORS_ALLOWED_ORIGINS, async_mode=config.SOCKETIO_ASYNC_MODE, logger=config.DEBUG, engineio_logger=config.DEBUG, json=OrjsonSocketJSON)
+
+class InventoryState:
+    """Trạng thái inventory dùng chung giữa thread đọc serial và các request, bảo vệ bởi một lock"""
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.tags = deque(maxlen=config.MAX_TAGS_DISPLAY)
+        self.stats = {"read_rate": 0, "total_count": 0}
+        # Tăng mỗi khi tags thay đổi; dùng làm ETag và khóa cache JSON của /api/get_tags
+        self.version = 0
+        self.thread = None
+        self.stop_flag = False
+        # Set khi không có inventory worker nào đang chạy (background task không có is_alive/join(timeout))
+        self.done = threading.Event()
+        self.done.set()
+        # True khi worker đang chạy tự dừng theo stop_flag và tự gửi STOP (tags inventory):
+        # khi đó chỉ set flag rồi chờ, không gửi STOP song song trên cùng cổng
+        self.stops_on_flag = False
+
+    def reset(self):
+        """Xoá tags và stats trước một phiên inventory mới"""
+        with self.lock:
+            self.stop_flag = False
+            self.tags.clear()
+            self.stats["read_rate"] = 0
+            self.stats["total_count"] = 0
+            self.version += 1
+
+    def add_tag(self, tag_data: dict):
+        with self.lock:
+            self.tags.append(tag_data)
+            self.version += 1
+
+    def snapshot(self):
+        """Trả về (tags, stats, version) nhất quán tại một thời điểm"""
+        with self.lock:
+            return list(self.tags), dict(self.stats), self.version
 
 # Global variables
 reader: Optional[serial.Serial] = None
-inventory_thread: Optional[threading.Thread] = None
-stop_inventory_flag = False
-detected_tags = []
-# detected_tags = deque(maxlen=config.MAX_TAGS_DISPLAY)
-# tag_queue = Queue()
-inventory_stats = {"read_rate": 0, "total_count": 0}
-connected_clients = set()
+state = InventoryState()
+_tags_json_cache = {"version": -1, "body": b""}
+# Hàng đợi tag giữa thread đọc serial và emitter (emit theo lô)
+TAG_QUEUE_SIZE = 4096
+TAG_BATCH_SIZE = 256
+TAG_FLUSH_INTERVAL = 0.05  # giây: tag đến trong cùng cửa sổ 50ms đi chung một frame
+# SimpleQueue (C, không Condition): thread đọc chỉ put_nowait, emitter chỉ get_nowait nên không chặn hub
+tag_queue = SimpleQueue()
+tag_emitter_task = None
+# Chỉ client đã subscribe_tags mới nhận luồng tag
+TAGS_ROOM = 'tags'
+
+# Response lỗi dùng chung (không sửa các dict này tại chỗ)
+ERR_NOT_CONNECTED = {"success": False, "message": "Chưa kết nối đến reader"}
+ERR_INVALID_ANTENNA = {"success": False, "message": "Antenna phải từ 1 đến 32"}
+ERR_EMPTY_EPC = {"success": False, "message": "EPC không được để trống"}
+# Reader hỗ trợ tối đa 32 antenna (ant1..ant32)
+VALID_ANTENNAS = frozenset(range(1, 33))
+# Body JSON đã encode sẵn cho các route trả lỗi trực tiếp
+ERR_NOT_CONNECTED_BODY = orjson.dumps(ERR_NOT_CONNECTED)
+ERR_EMPTY_EPC_BODY = orjson.dumps(ERR_EMPTY_EPC)
+
+# Cấu hình không đổi trong suốt vòng đời process → encode /api/config một lần
+CONFIG_RESPONSE_BODY = orjson.dumps({
+    "success": True,
+    "data": {
+        "default_port": config.DEFAULT_PORT,
+        "default_baudrate": config.DEFAULT_BAUDRATE,
+        "max_power": config.MAX_POWER,
+        "min_power": config.MIN_POWER,
+        "max_antennas": config.MAX_ANTENNAS,
+        "profiles": config.PROFILE_CONFIGS,
+        "max_tags_display": config.MAX_TAGS_DISPLAY
+    }
+}, option=ORJSON_OPTS)
+
+def normalize_antennas(antennas) -> Optional[List[int]]:
+    """Ép kiểu int, bỏ trùng và kiểm tra phạm vi antenna; None nếu không hợp lệ"""
+    try:
+        ants = set(map(int, antennas))
+    except (ValueError, TypeError):
+        return None
+    if not ants.issubset(VALID_ANTENNAS):
+        return None
+    return sorted(ants)
+
+# Body cho các endpoint polling khi reader idle (dashboard poll mỗi giây)
+EMPTY_TAGS_BODY = orjson.dumps({"success": True, "data": [], "stats": {"read_rate": 0, "total_count": 0}})
+IDLE_DEBUG_BODIES = {
+    stop_flag: orjson.dumps({
+        "success": True,
+        "data": {
+            "is_connected": False,
+            "inventory_thread_alive": False,
+            "stop_inventory_flag": stop_flag,
+            "detected_tags_count": 0,
+            "inventory_stats": {"read_rate": 0, "total_count": 0},
+            "recent_tags": []
+        }
+    })
+    for stop_flag in (False, True)
+}
+
+def json_body_response(body: bytes) -> Response:
+    """Trả Response từ body JSON đã encode sẵn"""
+    return Response(body, mimetype='application/json')
+
+def json_response(obj) -> Response:
+    """Thay jsonify: encode thẳng bằng orjson, không qua provider/app context của Flask"""
+    return Response(orjson.dumps(obj, option=ORJSON_OPTS), mimetype='application/json')
 
 # Configure logging
 logging.basicConfig(
@@ -45,6 +172,48 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Cache chuỗi "%H:%M:%S" theo giây: tag đọc cùng một giây dùng lại chuỗi đã format
+_ts_cache = {"sec": -1, "str": ""}
+
+def tag_timestamp() -> str:
+    """Timestamp "%H:%M:%S" cho tag, chỉ gọi strftime khi sang giây mới"""
+    sec = int(time.time())
+    c = _ts_cache
+    if c["sec"] != sec:
+        c["str"] = time.strftime("%H:%M:%S", time.localtime(sec))
+        c["sec"] = sec
+    return c["str"]
+
+def tag_emitter():
+    """Mỗi TAG_FLUSH_INTERVAL gom các tag trong tag_queue và emit theo lô ('tag_detected_batch')"""
+    while True:
+        socketio.sleep(TAG_FLUSH_INTERVAL)
+        batch = []
+        while len(batch) < TAG_BATCH_SIZE:
+            try:
+                batch.append(tag_queue.get_nowait())
+            except Empty:
+                break
+        if not batch:
+            continue
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("📡 Emitting %d tags", len(batch))
+        try:
+            socketio.emit('tag_detected_batch', batch, room=TAGS_ROOM)
+        except Exception as e:
+            logger.error("❌ WebSocket emit failed: %s", e)
+
+def ensure_tag_emitter():
+    """Khởi động emitter (một lần duy nhất)"""
+    global tag_emitter_task
+    if tag_emitter_task is None:
+        tag_emitter_task = socketio.start_background_task(tag_emitter)
+
+def enqueue_tag(tag_data: dict):
+    """Đưa tag vào hàng đợi emit; bỏ tag nếu vượt TAG_QUEUE_SIZE để không phình bộ nhớ"""
+    if tag_queue.qsize() < TAG_QUEUE_SIZE:
+        tag_queue.put_nowait(tag_data)
+
 class RFIDWebController:
     def __init__(self):
         self.reader = None
@@ -83,7 +252,7 @@ class RFIDWebController:
     def get_reader_info(self) -> Dict:
         """Lấy thông tin reader"""
         if not self.is_connected or not self.reader:
-            return {"success": False, "message": "Chưa kết nối đến reader"}
+            return ERR_NOT_CONNECTED
         try:
             info = self.reader.Query_Reader_Information()
             if info and isinstance(info, dict) and info:
@@ -98,7 +267,7 @@ class RFIDWebController:
     
     def configure_baseband(self, speed: int, q_value: int, session: int, inventory_flag: int) -> Dict:
         if not self.is_connected or not self.reader:
-            return {"success": False, "message": "Chưa kết nối đến reader"}
+            return ERR_NOT_CONNECTED
         try:
             ok = self.reader.configure_baseband(speed, q_value, session, inventory_flag)
             if ok:
@@ -111,7 +280,7 @@ class RFIDWebController:
 
     def query_baseband_profile(self) -> Dict:
         if not self.is_connected or not self.reader:
-            return {"success": False, "message": "Chưa kết nối đến reader"}
+            return ERR_NOT_CONNECTED
         try:
             info = self.reader.query_baseband_profile()
             if info:
@@ -123,20 +292,16 @@ class RFIDWebController:
             return {"success": False, "message": f"Lỗi: {str(e)}"}
     
     def start_inventory(self, antenna_mask: int ) -> Dict:
-        global inventory_thread, stop_inventory_flag, detected_tags, inventory_stats
-
         if not self.is_connected:
-            return {"success": False, "message": "Chưa kết nối đến reader"}
+            return ERR_NOT_CONNECTED
 
         # If inventory is already running, do not start another
-        if inventory_thread and inventory_thread.is_alive():
+        if not state.done.is_set():
             logger.warning("Inventory thread already running. Ignoring new start request.")
             return {"success": False, "message": "Inventory đang chạy"}
 
         try:
-            stop_inventory_flag = False
-            detected_tags.clear()
-            inventory_stats = {"read_rate": 0, "total_count": 0}
+            state.reset()
 
             # Only flush input, avoid unnecessary sleeps
             try:
@@ -144,34 +309,36 @@ class RFIDWebController:
             except Exception as e:
                 logger.warning(f"Buffer clear warning: {e}")
 
-            def tag_callback(tag: dict):
-                logger.info(f"🔍 Tag callback called: EPC={tag.get('epc')}, RSSI={tag.get('rssi')}, Antenna={tag.get('antenna_id')}")
+            # Hot path (hàng trăm tag/giây): bind sẵn các hàm vào default args để dùng LOAD_FAST thay vì LOAD_GLOBAL
+            def tag_callback(tag: dict, _get=dict.get, _ts=tag_timestamp, _add=state.add_tag,
+                             _enqueue=enqueue_tag, _debug=logger.isEnabledFor(logging.DEBUG)):
                 tag_data = {
-                    "epc": tag.get("epc"),
-                    "rssi": tag.get("rssi"),
-                    "antenna": tag.get("antenna_id"),
-                    "timestamp": time.strftime("%H:%M:%S")
+                    "epc": _get(tag, "epc"),
+                    "rssi": _get(tag, "rssi"),
+                    "antenna": _get(tag, "antenna_id"),
+                    "timestamp": _ts()
                 }
-                print(f"Detected tag: {tag_data}")
-                detected_tags.append(tag_data)
-                if len(detected_tags) > config.MAX_TAGS_DISPLAY:
-                    detected_tags.pop(0)
-                try:
-                    socketio.emit('tag_detected', tag_data)
-                except Exception as e:
-                    logger.error(f"❌ WebSocket emit failed: {e}")
+                _add(tag_data)
+                _enqueue(tag_data)
+                if _debug:
+                    logger.debug("Tag callback: %s", tag_data)
 
             def inventory_worker():
                 try:         
-                    # Start inventory with callbacks
-                    self.reader.start_inventory_with_mode(antenna_mask=antenna_mask,callback=tag_callback)
+                    # Start inventory with callbacks; giữ background task sống tới khi thread nhận kết thúc
+                    # để state.done phản ánh đúng trạng thái inventory
+                    if self.reader.start_inventory_with_mode(antenna_mask=antenna_mask, callback=tag_callback):
+                        self.reader.wait_inventory()
                 except Exception as e:
                     logger.error(f"Inventory worker error: {e}")
                 finally:
+                    state.done.set()
                     logger.info("Inventory worker finished")
 
-            inventory_thread = threading.Thread(target=inventory_worker, daemon=True)
-            inventory_thread.start()
+            ensure_tag_emitter()
+            state.done.clear()
+            state.stops_on_flag = False
+            state.thread = socketio.start_background_task(inventory_worker)
 
             logger.info("Started inventory thread.")
             return {"success": True, "message": "Inventory đã bắt đầu"}
@@ -182,43 +349,30 @@ class RFIDWebController:
     
     def stop_inventory(self) -> Dict:
         """Dừng inventory"""
-        global stop_inventory_flag
-        
         if not self.is_connected:
-            return {"success": False, "message": "Chưa kết nối đến reader"}
+            return ERR_NOT_CONNECTED
         
         try:
             # Set flag để dừng inventory
-            stop_inventory_flag = True
+            state.stop_flag = True
             
-            # Gửi lệnh stop đến reader
-            if self.reader:
-                # Gửi lệnh stop nhiều lần để đảm bảo reader nhận được
-                for i in range(3):
-                    try:
-                        self.reader.stop_inventory()
-                        time.sleep(0.1)
-                    except Exception as e:
-                        logger.warning(f"Stop command attempt {i+1} failed: {e}")
-                
-                # Đợi reader xử lý lệnh stop
-                time.sleep(0.5)
-                
-                # Clear buffer sau khi stop
+            # Gửi lệnh stop đến reader (trừ khi tags worker đang giữ cổng: nó tự gửi STOP khi thấy flag)
+            if self.reader and (state.done.is_set() or not state.stops_on_flag):
+                # Gửi lệnh stop một lần và chờ ACK; chỉ gửi lại khi hết thời gian chờ
                 try:
-                    self.reader.uart.flush_input()
-                    time.sleep(0.1)
+                    if not self.reader.stop_inventory(timeout=0.5):
+                        logger.warning("Stop command not acknowledged, retrying once")
+                        self.reader.stop_inventory(timeout=0.5)
                 except Exception as e:
-                    logger.warning(f"Buffer clear warning: {e}")
+                    logger.warning(f"Stop command failed: {e}")
             
             # Đợi thread dừng (tối đa 3 giây)
-            if inventory_thread and inventory_thread.is_alive():
-                inventory_thread.join(timeout=3.0)
-                if inventory_thread.is_alive():
+            if not state.done.is_set():
+                if not state.done.wait(timeout=3.0):
                     logger.warning("Inventory thread không dừng trong thời gian chờ")
                     # Force stop bằng cách set flag và đợi thêm
-                    stop_inventory_flag = True
-                    time.sleep(0.5)
+                    state.stop_flag = True
+                    socketio.sleep(0.5)
             
             logger.info("Stopped inventory")
             return {"success": True, "message": "Đã dừng inventory"}
@@ -229,7 +383,7 @@ class RFIDWebController:
     def set_power(self,  antenna_powers: dict[int, int], preserve_config: bool = True) -> Dict:
         """Thiết lập công suất RF"""
         if not self.is_connected:
-            return {"success": False, "message": "Chưa kết nối đến reader"}
+            return ERR_NOT_CONNECTED
         
         # if not config.MIN_POWER <= antenna_powers <= config.MAX_POWER:
         #     return {"success": False, "message": f"Công suất phải từ {config.MIN_POWER} đến {config.MAX_POWER} dBm"}
@@ -252,7 +406,7 @@ class RFIDWebController:
     def get_antenna_power(self) -> Dict:
         """Lấy công suất antennas"""
         if not self.is_connected:
-            return {"success": False, "message": "Chưa kết nối đến reader"}
+            return ERR_NOT_CONNECTED
         
         try:
             power_levels = self.reader.query_reader_power()
@@ -272,7 +426,7 @@ class RFIDWebController:
     def set_buzzer(self, enable: bool) -> Dict:
         """Bật/tắt buzzer dựa trên NationReader.set_beeper"""
         if not self.is_connected or not self.reader:
-            return {"success": False, "message": "Chưa kết nối đến reader"}
+            return ERR_NOT_CONNECTED
         try:
             # Mode: 1 = continuous beep, 0 = off, 2 = beep on new tag (optional)
             mode = 1 if enable else 0
@@ -290,7 +444,7 @@ class RFIDWebController:
     def get_current_profile(self) -> Dict:
         """Lấy profile hiện tại"""
         if not self.is_connected:
-            return {"success": False, "message": "Chưa kết nối đến reader"}
+            return ERR_NOT_CONNECTED
         
         try:
             profile = get_profile(self.reader)
@@ -306,7 +460,7 @@ class RFIDWebController:
     def set_profile(self, profile_num: int, save_on_power_down: bool = True) -> Dict:
         """Thiết lập profile"""
         if not self.is_connected:
-            return {"success": False, "message": "Chưa kết nối đến reader"}
+            return ERR_NOT_CONNECTED
         
         if profile_num not in config.PROFILE_CONFIGS:
             return {"success": False, "message": "Profile không hợp lệ"}
@@ -326,11 +480,12 @@ class RFIDWebController:
     def enable_antennas(self, antennas: List[int], save_on_power_down: bool = True) -> Dict:
         """Bật antennas"""
         if not self.is_connected or not self.reader:
-            return {"success": False, "message": "Chưa kết nối đến reader"}
+            return ERR_NOT_CONNECTED
 
         # Validate antenna numbers
-        if not all(1 <= ant <= 32 for ant in antennas):
-            return {"success": False, "message": "Antenna phải từ 1 đến 32"}
+        antennas = normalize_antennas(antennas)
+        if antennas is None:
+            return ERR_INVALID_ANTENNA
 
         try:
             # Use NationReader method to enable antennas
@@ -346,11 +501,12 @@ class RFIDWebController:
     def disable_antennas(self, antennas: List[int], save_on_power_down: bool = True) -> Dict:
         """Tắt antennas"""
         if not self.is_connected or not self.reader:
-            return {"success": False, "message": "Chưa kết nối đến reader"}
+            return ERR_NOT_CONNECTED
 
         # Validate antenna numbers
-        if not all(1 <= ant <= 32 for ant in antennas):
-            return {"success": False, "message": "Antenna phải từ 1 đến 32"}
+        antennas = normalize_antennas(antennas)
+        if antennas is None:
+            return ERR_INVALID_ANTENNA
 
         try:
             # Use NationReader method to disable antennas
@@ -365,7 +521,7 @@ class RFIDWebController:
         
     def set_power_for_antenna(self, antenna: int, power: int, preserve_config: bool = True) -> Dict:
         if not self.is_connected:
-            return {"success": False, "message": "Chưa kết nối đến reader"}
+            return ERR_NOT_CONNECTED
         try:
             result = self.reader.configure_reader_power({antenna: power}, persistence=preserve_config)
             if result:
@@ -377,15 +533,14 @@ class RFIDWebController:
             logger.error(f"Set power error: {e}")
             return {"success": False, "message": f"Lỗi: {str(e)}"}
         
-    def set_power_multi(self, powers: dict, preserve_config: bool = True) -> Dict:
+    def set_power_multi(self, powers: dict[int, int], preserve_config: bool = True) -> Dict:
+        """Thiết lập công suất nhiều antenna; powers đã được route ép kiểu {int: int}"""
         if not self.is_connected:
-            return {"success": False, "message": "Chưa kết nối đến reader"}
+            return ERR_NOT_CONNECTED
         try:
-            # Convert string keys to int
-            powers_int = {int(k): int(v) for k, v in powers.items()}
-            result = self.reader.configure_reader_power(powers_int, persistence=preserve_config)
+            result = self.reader.configure_reader_power(powers, persistence=preserve_config)
             if result:
-                logger.info(f"Set power for all antennas: {powers_int}")
+                logger.info(f"Set power for all antennas: {powers}")
                 return {"success": True, "message": f"Đã thiết lập công suất cho tất cả antennas"}
             else:
                 return {"success": False, "message": "Không thể thiết lập công suất"}
@@ -408,7 +563,7 @@ class RFIDWebController:
         Uses NationReader.write_to_target_tag and returns its result.
         """
         if not self.is_connected or not self.reader:
-            return {"success": False, "message": "Chưa kết nối đến reader"}
+            return ERR_NOT_CONNECTED
 
         try:
             result = self.reader.write_to_target_tag(
@@ -448,19 +603,19 @@ def api_connect():
     baudrate = data.get('baudrate', config.DEFAULT_BAUDRATE)
     print(f"Connecting to RFID reader on port {port} with baudrate {baudrate}")
     result = rfid_controller.connect(port, baudrate)
-    return jsonify(result)
+    return json_response(result)
 
 @app.route('/api/disconnect', methods=['POST'])
 def api_disconnect():
     """API ngắt kết nối reader"""
     result = rfid_controller.disconnect()
-    return jsonify(result)
+    return json_response(result)
 
 @app.route('/api/reader_info', methods=['GET'])
 def api_reader_info():
     """API lấy thông tin reader"""
     result = rfid_controller.get_reader_info()
-    return jsonify(result)
+    return json_response(result)
 
 @app.route('/api/start_inventory', methods=['POST'])
 def api_start_inventory():
@@ -468,27 +623,25 @@ def api_start_inventory():
     data = request.get_json()
     antenna_mask = data.get('selectedAntennas')
     result = rfid_controller.start_inventory(antenna_mask)
-    return jsonify(result)
+    return json_response(result)
 
 @app.route('/api/stop_inventory', methods=['POST'])
 def api_stop_inventory():
     """API dừng inventory"""
     result = rfid_controller.stop_inventory()
-    return jsonify(result)
+    return json_response(result)
 
 @app.route('/api/stop_tags_inventory', methods=['POST'])
 def api_stop_tags_inventory():
     """API dừng tags inventory"""
-    global stop_inventory_flag
-    
     try:
         # Set flag để dừng inventory
-        stop_inventory_flag = True
+        state.stop_flag = True
         
         # Đợi thread kết thúc
-        if inventory_thread and inventory_thread.is_alive():
+        if not state.done.is_set():
             logger.info("Waiting for tags inventory thread to finish...")
-            inventory_thread.join(timeout=3.0)  # Đợi tối đa 3 giây
+            state.done.wait(timeout=3.0)  # Đợi tối đa 3 giây
         
         logger.info("Tags inventory stopped successfully")
         return {"success": True, "message": "Đã dừng tags inventory thành công"}
@@ -502,15 +655,18 @@ def api_set_power():
     powers = data.get('powers')
     preserve_config = data.get('preserveConfig', True)  # <-- Fix key to match frontend
     if powers:
-        # Convert string keys to int for backend compatibility
-        powers_int = {int(k): int(v) for k, v in powers.items()}
+        # Convert string keys to int for backend compatibility (một lần duy nhất)
+        try:
+            powers_int = {int(k): int(v) for k, v in powers.items()}
+        except (ValueError, TypeError, AttributeError):
+            return json_response({"success": False, "message": "Công suất không hợp lệ"})
         result = rfid_controller.set_power_multi(powers_int, preserve_config)
     else:
         # Fallback: single antenna (legacy)
         power = data.get('power')
         antenna = data.get('antenna', 1)
         result = rfid_controller.set_power_for_antenna(antenna, power, preserve_config)
-    return jsonify(result)
+    return json_response(result)
 
 @app.route('/api/set_buzzer', methods=['POST'])
 def api_set_buzzer():
@@ -519,13 +675,13 @@ def api_set_buzzer():
     enable = data.get('enable', True)
     
     result = rfid_controller.set_buzzer(enable)
-    return jsonify(result)
+    return json_response(result)
 
 @app.route('/api/get_profile', methods=['GET'])
 def api_get_profile():
     """API lấy profile hiện tại"""
     result = rfid_controller.get_current_profile()
-    return jsonify(result)
+    return json_response(result)
 
 @app.route('/api/set_profile', methods=['POST'])
 def api_set_profile():
@@ -535,17 +691,17 @@ def api_set_profile():
     save_on_power_down = data.get('save_on_power_down', True)
     
     result = rfid_controller.set_profile(profile_num, save_on_power_down)
-    return jsonify(result)
+    return json_response(result)
 
 @app.route('/api/get_enabled_antennas', methods=['GET'])
 def api_get_enabled_antennas():
     if not rfid_controller.is_connected:
-        return jsonify({"success": False, "message": "Chưa kết nối đến reader"})
+        return json_body_response(ERR_NOT_CONNECTED_BODY)
     try:
         ants = rfid_controller.reader.get_enabled_ants()
-        return jsonify({"success": True, "antennas": ants})
+        return json_response({"success": True, "antennas": ants})
     except Exception as e:
-        return jsonify({"success": False, "message": str(e)})
+        return json_response({"success": False, "message": str(e)})
 
 @app.route('/api/disable_antennas', methods=['POST'])
 def api_disable_antennas():
@@ -555,60 +711,67 @@ def api_disable_antennas():
     save_on_power_down = data.get('save_on_power_down', True)
     
     result = rfid_controller.disable_antennas(antennas, save_on_power_down)
-    return jsonify(result)
+    return json_response(result)
 
 @app.route('/api/get_antenna_power', methods=['GET'])
 def api_get_antenna_power():
     """API lấy công suất antennas"""
     result = rfid_controller.get_antenna_power()
-    return jsonify(result)
-
-# @app.route('/api/get_tags', methods=['GET'])
-# def api_get_tags():
-#     """API lấy danh sách tags đã phát hiện"""
-#     return jsonify({
-#         "success": True,
-#         "data": detected_tags,
-#         "stats": inventory_stats
-#     })
+    return json_response(result)
+
+@app.route('/api/get_tags', methods=['GET'])
+def api_get_tags():
+    """API lấy danh sách tags đã phát hiện (ETag theo state.version, 304 khi không đổi)"""
+    version = state.version
+    etag = f'W/"{version}"'
+    if request.headers.get('If-None-Match') == etag:
+        return Response(status=304, headers={'ETag': etag})
+    if not state.tags:
+        # Reader idle/chưa có tag: trả body rỗng encode sẵn
+        return Response(EMPTY_TAGS_BODY, mimetype='application/json', headers={'ETag': etag})
+    cache = _tags_json_cache
+    if cache["version"] != version:
+        tags, stats, version = state.snapshot()
+        etag = f'W/"{version}"'
+        cache["body"] = orjson.dumps({
+            "success": True,
+            "data": tags,
+            "stats": stats
+        }, option=ORJSON_OPTS)
+        cache["version"] = version
+    return Response(cache["body"], mimetype='application/json', headers={'ETag': etag})
 
 @app.route('/api/config', methods=['GET'])
 def api_get_config():
-    """API lấy cấu hình"""
+    """API lấy cấu hình (body encode sẵn lúc khởi động)"""
+    return json_body_response(CONFIG_RESPONSE_BODY)
+
+
+@app.route('/api/debug', methods=['GET'])
+def api_debug():
+    """API debug info"""
+    if not rfid_controller.is_connected and not state.tags and state.done.is_set():
+        return json_body_response(IDLE_DEBUG_BODIES[bool(state.stop_flag)])
     try:
-        config_data = {
-            "default_port": config.DEFAULT_PORT,
-            "default_baudrate": config.DEFAULT_BAUDRATE,
-            "max_power": config.MAX_POWER,
-            "min_power": config.MIN_POWER,
-            "max_antennas": config.MAX_ANTENNAS,
-            "profiles": config.PROFILE_CONFIGS,
-            "max_tags_display": config.MAX_TAGS_DISPLAY
+        with state.lock:
+            tags_count = len(state.tags)
+            # deque không hỗ trợ slice → islice lấy 10 tags gần nhất
+            recent_tags = list(islice(state.tags, max(0, tags_count - 10), None))
+            stats = dict(state.stats)
+        data = {
+            "is_connected": rfid_controller.is_connected,
+            "inventory_thread_alive": not state.done.is_set(),
+            "stop_inventory_flag": state.stop_flag,
+            "detected_tags_count": tags_count,
+            "inventory_stats": stats,
+            "recent_tags": recent_tags
         }
-        return {"success": True, "data": config_data}
+        return {"success": True, "data": data}
     except Exception as e:
-        logger.error(f"Config API error: {e}")
+        logger.error(f"Debug API error: {e}")
         return {"success": False, "message": f"Lỗi: {str(e)}"}
 
 
-# @app.route('/api/debug', methods=['GET'])
-# def api_debug():
-#     """API debug info"""
-#     try:
-#         data = {
-#             "is_connected": rfid_controller.is_connected,
-#             "inventory_thread_alive": inventory_thread.is_alive() if inventory_thread else False,
-#             "stop_inventory_flag": stop_inventory_flag,
-#             "detected_tags_count": len(detected_tags),
-#             "inventory_stats": inventory_stats,
-#             "recent_tags": detected_tags[-10:] if detected_tags else []  # 10 tags gần nhất
-#         }
-#         return {"success": True, "data": data}
-#     except Exception as e:
-#         logger.error(f"Debug API error: {e}")
-#         return {"success": False, "message": f"Lỗi: {str(e)}"}
-
-
 @app.route('/api/configure_baseband', methods=['POST'])
 def api_configure_baseband():
     """API cấu hình baseband"""
@@ -618,13 +781,13 @@ def api_configure_baseband():
     session = int(data.get('session', 2))
     inventory_flag = int(data.get('inventory_flag', 0))
     result = rfid_controller.configure_baseband(speed, q_value, session, inventory_flag)
-    return jsonify(result)
+    return json_response(result)
 
 @app.route('/api/query_baseband_profile', methods=['GET'])
 def api_query_baseband_profile():
     """API lấy thông tin baseband profile"""
     result = rfid_controller.query_baseband_profile()
-    return jsonify(result)
+    return json_response(result)
 
 
 @socketio.on('connect')
@@ -632,45 +795,55 @@ def handle_connect():
     """Xử lý khi client kết nối WebSocket"""
     logger.info(f"🔌 WebSocket client connected: {request.sid}")
     socketio.emit('status', {'message': 'Connected to server'})
-    connected_clients.add(request.sid)
 
 @socketio.on('disconnect')
 def handle_disconnect():
     """Xử lý khi client ngắt kết nối WebSocket"""
     logger.info(f"🔌 WebSocket client disconnected: {request.sid}")
-    connected_clients.remove(request.sid)
+    # Socket.IO tự rời các room (kể cả TAGS_ROOM) khi client ngắt kết nối
+
+@socketio.on('subscribe_tags')
+def handle_subscribe_tags():
+    """Client xem danh sách tag đăng ký nhận luồng tag realtime"""
+    join_room(TAGS_ROOM)
+
+@socketio.on('unsubscribe_tags')
+def handle_unsubscribe_tags():
+    leave_room(TAGS_ROOM)
 
 @socketio.on('message')
 def handle_message(message):
     """Xử lý message từ client"""
-    logger.info(f"📨 Received WebSocket message: {message}")
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("📨 Received WebSocket message: %s", message)
 
 @app.route('/api/tags_inventory', methods=['POST'])
 def api_tags_inventory():
     """API bắt đầu tags inventory với cấu hình tuỳ chọn (liên tục)"""
-    global inventory_thread, stop_inventory_flag, detected_tags, inventory_stats
-
     if not rfid_controller.is_connected:
-        return {"success": False, "message": "Chưa kết nối đến reader"}
-
-    # Nếu inventory đang chạy, dừng rồi chờ thread kết thúc
-    if inventory_thread and inventory_thread.is_alive():
-        logger.info("Inventory đang chạy, dừng trước khi start lại")
-        rfid_controller.reader.stop_inventory()
-        time.sleep(1.0)  # Đảm bảo reader ổn định
+        return ERR_NOT_CONNECTED
 
     try:
-        # Reset trạng thái
-        stop_inventory_flag = False
-        detected_tags.clear()
-        inventory_stats = {"read_rate": 0, "total_count": 0}
-
-        # Lấy tham số từ request
+        # Lấy và kiểm tra tham số trước, để request lỗi không làm mất trạng thái phiên đang chạy
         data      = request.get_json()
         q_value   = int(data.get("q_value", 4))
         session   = int(data.get("session", 0))
         inventory_flag = int(data.get("inventory_flag", 0))  # 0: Single, 1: Continuous, 2: Fast
         scan_time = int(data.get("scan_time", 10))  # Not used directly in NationReader, but can be used for sleep
+        antennas  = normalize_antennas(data.get("antennas", [config.DEFAULT_ANTENNA]))
+        if not antennas:
+            return ERR_INVALID_ANTENNA
+
+        # Nếu inventory đang chạy, dừng qua controller (chỉ set flag nếu là tags worker) rồi chờ
+        # worker cũ kết thúc hẳn, để state.done.set() của nó không rơi sau state.done.clear() bên dưới
+        if not state.done.is_set():
+            logger.info("Inventory đang chạy, dừng trước khi start lại")
+            rfid_controller.stop_inventory()
+            if not state.done.is_set():
+                return {"success": False, "message": "Inventory trước chưa dừng, vui lòng thử lại"}
+
+        # Reset trạng thái
+        state.reset()
 
         # Cấu hình baseband trước khi inventory
         if not rfid_controller.reader.configure_baseband(
@@ -682,40 +855,40 @@ def api_tags_inventory():
             return {"success": False, "message": "Không thể cấu hình baseband"}
 
         # Callback khi có tag mới
-        def tag_callback(tag: dict):
+        def tag_callback(tag: dict, _get=dict.get, _ts=tag_timestamp, _add=state.add_tag, _enqueue=enqueue_tag):
             tag_data = {
-                "epc":       tag.get("epc"),
-                "rssi":      tag.get("rssi"),
-                "antenna":   tag.get("antenna_id"),
-                "timestamp": time.strftime("%H:%M:%S")
+                "epc":       _get(tag, "epc"),
+                "rssi":      _get(tag, "rssi"),
+                "antenna":   _get(tag, "antenna_id"),
+                "timestamp": _ts()
             }
-            detected_tags.append(tag_data)
-            if len(detected_tags) > config.MAX_TAGS_DISPLAY:
-                detected_tags.pop(0)
-            try:
-                socketio.emit("tag_detected", tag_data)
-            except Exception as e:
-                logger.error(f"❌ WebSocket emit failed: {e}")
+            _add(tag_data)
+            _enqueue(tag_data)
 
         # Thread worker: run inventory for scan_time*100ms, then stop
         def inventory_worker():
             try:
                 rfid_controller.reader.uart.flush_input()
-                rfid_controller.reader.start_inventory(on_tag=tag_callback)
                 logger.info("▶️ Inventory started (custom tags inventory mode)")
-                
-                time.sleep(scan_time * 0.1)
+                # Đọc UART non-blocking ngay trên background task (select nhường hub eventlet)
+                # Dừng sớm khi /api/stop_tags_inventory set state.stop_flag
+                rfid_controller.reader.start_inventory_nonblocking(
+                    antennas, on_tag=tag_callback, duration=scan_time * 0.1,
+                    should_stop=lambda: state.stop_flag
+                )
                 rfid_controller.reader.stop_inventory()
-                logger.info("⏹️ Inventory stopped after scan_time")
+                logger.info("⏹️ Inventory stopped")
             except Exception as e:
                 logger.error(f"Tags inventory worker error: {e}")
             finally:
+                state.done.set()
                 logger.info("Tags inventory worker finished")
 
-        # Khởi thread
-        inventory_thread = threading.Thread(target=inventory_worker)
-        inventory_thread.daemon = True
-        inventory_thread.start()
+        # Khởi background task (green thread trên hub eventlet)
+        ensure_tag_emitter()
+        state.done.clear()
+        state.stops_on_flag = True
+        state.thread = socketio.start_background_task(inventory_worker)
 
         logger.info(f"Started tags inventory (Q={q_value}, Session={session}, Flag={inventory_flag}, Scan={scan_time})")
         return {
@@ -747,9 +920,9 @@ def api_write_epc_tag_auto():
     access_pwd = data.get('access_pwd')
     timeout = data.get('timeout')
     if not epc:
-        return jsonify({"success": False, "message": "EPC không được để trống"})
+        return json_body_response(ERR_EMPTY_EPC_BODY)
     if not rfid_controller.is_connected or not rfid_controller.reader:
-        return jsonify({"success": False, "message": "Chưa kết nối đến reader"})
+        return json_body_response(ERR_NOT_CONNECTED_BODY)
     try:
         result = rfid_controller.reader.write_epc_tag_auto(
             new_epc_hex=epc,
@@ -758,10 +931,10 @@ def api_write_epc_tag_auto():
             access_password=access_pwd,
             timeout=timeout
         )
-        return jsonify(result)
+        return json_response(result)
     except Exception as e:
         logger.error(f"Write EPC auto error: {e}")
-        return jsonify({"success": False, "message": f"Lỗi: {str(e)}"})
+        return json_response({"success": False, "message": f"Lỗi: {str(e)}"})
     
 @app.route('/api/check_write_epc', methods=['POST'])
 def check_write_epc():
@@ -781,22 +954,22 @@ def check_write_epc():
 
     
     if not epc:
-        return jsonify({"success": False, "message": "EPC không được để trống"})
+        return json_body_response(ERR_EMPTY_EPC_BODY)
     
     if not rfid_controller.is_connected or not rfid_controller.reader:
-        return jsonify({"success": False, "message": "Chưa kết nối đến reader"})
+        return json_body_response(ERR_NOT_CONNECTED_BODY)
     
     try:
         result = rfid_controller.reader.check_write_epc(
             epcHex=epc,
         )
         if result is None:
-            return jsonify({"success": False, "message": "Không thể kiểm tra khả năng ghi EPC"})
+            return json_response({"success": False, "message": "Không thể kiểm tra khả năng ghi EPC"})
         if result is True:
-            return jsonify({"success": True, "message": "Matching"})
+            return json_response({"success": True, "message": "Matching"})
     except Exception as e:
         logger.error(f"Check write EPC error: {e}")
-        return jsonify({"success": False, "message": f"Lỗi: {str(e)}"})
+        return json_response({"success": False, "message": f"Lỗi: {str(e)}"})
     
     
 if __name__ == '__main__':
@@ -57,6 +57,13 @@ class Config:
     # Scan Time Configuration
     MIN_SCAN_TIME = 1
     MAX_SCAN_TIME = 255
+    
+    # Profile Configuration (hiển thị qua /api/config)
+    PROFILE_CONFIGS = {
+        1: {"name": "Performance", "speed": 0, "q_value": 7, "session": 0, "inventory_flag": 1},
+        2: {"name": "Density", "speed": 1, "q_value": 4, "session": 1, "inventory_flag": 0},
+        3: {"name": "Balanced", "speed": 2, "q_value": 5, "session": 2, "inventory_flag": 2},
+    }
 
 class DevelopmentConfig(Config):
     """Cấu hình cho môi trường development"""
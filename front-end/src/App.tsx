@@ -84,7 +84,7 @@ export default function Dashboard() {
   
     socketRef.current = socket;
   
-    const handleTagDetected = (tagData: any) => {
+    const mergeTag = (tagData: any) => {
       const map = tagMapRef.current;
       const { epc } = tagData;
       if (map.has(epc)) {
@@ -107,17 +107,33 @@ export default function Dashboard() {
           lastSeen: tagData.timestamp,
         });
       }
-      const arr = Array.from(map.values());
+    };
+
+    const publishTags = () => {
+      const arr = Array.from(tagMapRef.current.values());
       setTags(arr);
       setDetectedTags(arr.length);
       setTotalTags(arr.reduce((s, t) => s + t.count, 0));
     };
+
+    // Server gom nhiều tag vào một frame 'tag_detected_batch'
+    const handleTagBatch = (batch: any[]) => {
+      if (!Array.isArray(batch) || batch.length === 0) return;
+      batch.forEach(mergeTag);
+      publishTags();
+    };
   
-    socket.on("tag_detected", handleTagDetected);
+    // Server chỉ gửi tag cho client đã join room 'tags' (join lại sau mỗi lần reconnect)
+    const subscribeTags = () => socket.emit("subscribe_tags");
+
+    socket.on("connect", subscribeTags);
+    socket.on("tag_detected_batch", handleTagBatch);
     socket.on("inventory_end", () => setIsInventoryRunning(false));
   
     return () => {
-      socket.off("tag_detected", handleTagDetected); 
+      socket.off("connect", subscribeTags);
+      socket.off("tag_detected_batch", handleTagBatch);
+      socket.emit("unsubscribe_tags");
       socket.disconnect();                           
       socketRef.current = null;
     };
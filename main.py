@@ -242,67 +242,353 @@
 
 
 from nation import NationReader
-import time, json, threading
-
-# ---------- Worker function for each UART port ----------
-def run_reader(port: str, baud: int = 115200):
-    tag_count = 0
-    unique_epcs = set()
-
+import argparse, array, asyncio, logging, os, queue, selectors, signal, subprocess, sys, threading, time
+import orjson
+from typing import Optional
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+try:
+    # Tuỳ chọn: phát beep trong process (PortAudio) thay vì spawn ffplay mỗi lần
+    import sounddevice, soundfile
+except ImportError:
+    sounddevice = soundfile = None
+
+DEDUP_MAX_KEYS = 4096  # Dọn bảng dedup khi vượt số key này
+TAG_QUEUE_SIZE = 1024  # Giới hạn hàng đợi tag giữa thread reader và event loop
+FLUSH_INTERVAL = 0.01  # giây: ghi stdout theo lô mỗi 10ms
+BEEP_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "front-end", "public", "beep.mp3")
+
+# Log trạng thái ra stderr; stdout chỉ dành cho JSON tag
+logger = logging.getLogger(__name__)
+
+# ---------- Beep: một worker duy nhất, burst tag gộp thành một tiếng ----------
+_beep_q = queue.Queue(maxsize=1)
+_beep_pcm = None  # (samples int16, sample_rate) khi đã decode được beep.mp3
+
+def load_beep_pcm():
+    """Decode beep.mp3 một lần lúc khởi động; None nếu không có sounddevice/soundfile"""
+    if sounddevice is None:
+        return None
+    try:
+        return soundfile.read(BEEP_FILE, dtype="int16")
+    except Exception as e:
+        logger.warning("⚠️ Không decode được %s, dùng ffplay: %s", BEEP_FILE, e)
+        return None
+
+def _beep_worker():
+    while True:
+        _beep_q.get()
+        try:
+            if _beep_pcm is not None:
+                sounddevice.play(*_beep_pcm, blocking=True)
+                continue
+            subprocess.run(
+                ["ffplay", "-nodisp", "-autoexit", BEEP_FILE],
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL
+            )
+        except Exception as e:
+            logger.warning("⚠️ Beep error: %s", e)
+
+def start_beeper():
+    global _beep_pcm
+    _beep_pcm = load_beep_pcm()
+    threading.Thread(target=_beep_worker, daemon=True).start()
+
+def beep():
+    """Yêu cầu beep; bỏ qua nếu đã có beep đang chờ phát"""
+    try:
+        _beep_q.put_nowait(1)
+    except queue.Full:
+        pass
+
+# ---------- Tinh chỉnh serial cho độ trễ thấp ----------
+TIOCGSERIAL = 0x541E
+TIOCSSERIAL = 0x541F
+ASYNC_LOW_LATENCY = 1 << 13
+RX_BUFFER_SIZE = 65536
+
+def tune_serial_for_latency(ser):
+    """
+    - Tăng buffer RX của driver (chỉ backend Windows hỗ trợ set_buffer_size)
+    - Bật ASYNC_LOW_LATENCY (Linux): FTDI bỏ latency timer 16ms, gửi byte lên ngay
+    - timeout=0: read() trả về ngay những gì đang có, vòng nhận tự nghỉ khi buffer rỗng
+    """
+    if hasattr(ser, "set_buffer_size"):
+        ser.set_buffer_size(rx_size=RX_BUFFER_SIZE)
+    if fcntl is not None:
+        try:
+            # struct serial_struct: flags là int thứ 5 (offset 16)
+            buf = array.array("i", [0] * 32)
+            fcntl.ioctl(ser.fileno(), TIOCGSERIAL, buf, True)
+            buf[4] |= ASYNC_LOW_LATENCY
+            fcntl.ioctl(ser.fileno(), TIOCSSERIAL, buf)
+        except OSError as e:
+            logger.warning("⚠️[%s] Không bật được low-latency: %s", ser.port, e)
+    ser.timeout = 0
+
+# ---------- Vòng đọc UART: selector + os.readv vào buffer cấp phát sẵn ----------
+READ_CHUNK = 4096
+
+def pin_current_thread(cpu: Optional[int]):
+    """Ghim thread hiện tại vào một CPU (Linux; pid 0 = thread gọi). Trả về affinity cũ để khôi phục"""
+    if cpu is None or not hasattr(os, "sched_setaffinity"):
+        return None
+    try:
+        old = os.sched_getaffinity(0)
+        os.sched_setaffinity(0, {cpu})
+        return old
+    except OSError as e:
+        logger.warning("⚠️ Không ghim được CPU %s: %s", cpu, e)
+        return None
+
+def read_loop(reader: NationReader, halt: threading.Event, cpu: Optional[int] = None):
+    """
+    Đọc fd của serial (pyserial đã cấu hình raw/baud) ở chế độ non-blocking,
+    mỗi lần selector báo có dữ liệu chỉ một syscall readv, rồi đưa bytes vào reader.feed_bytes().
+    """
+    old_affinity = pin_current_thread(cpu)
+    fd = reader.uart.ser.fileno()
+    buf = memoryview(bytearray(READ_CHUNK))
+    os.set_blocking(fd, False)
+    sel = selectors.DefaultSelector()  # epoll trên Linux
+    sel.register(fd, selectors.EVENT_READ)
+    try:
+        while not halt.is_set():
+            if not sel.select(0.1):
+                continue
+            try:
+                n = os.readv(fd, [buf])
+            except BlockingIOError:
+                continue
+            if n and reader.feed_bytes(buf[:n]):
+                return  # Reader báo read-end
+    finally:
+        sel.close()
+        os.set_blocking(fd, True)
+        if old_affinity is not None:
+            # Thread của executor được dùng lại → trả affinity cũ
+            os.sched_setaffinity(0, old_affinity)
+
+# ---------- Khởi tạo reader (blocking, chạy trong executor) ----------
+# Example configuration (tuỳ chỉnh lại nếu cần)
+BASEBAND_PROFILE = {"speed": 0, "q_value": 1, "session": 0, "inventory_flag": 0}
+ANTENNA_POWER = {1: 10, 2: 0, 3: 0, 4: 0}
+
+def config_matches(current: dict, wanted: dict) -> bool:
+    """True nếu mọi khoá trong wanted đã có cùng giá trị trên reader (query lỗi → {} → False)"""
+    return bool(current) and all(current.get(k) == v for k, v in wanted.items())
+
+def open_reader(port: str, baud: int = 115200) -> Optional[NationReader]:
     reader = NationReader(port, baud)
     reader.open()
-    print(f"🔧[{port}] Connecting & initializing...")
+    logger.info("🔧[%s] Connecting & initializing...", port)
     if not reader.Connect_Reader_And_Initialize():
-        print(f"❌[{port}] Init failed")
+        logger.error("❌[%s] Init failed", port)
+        reader.close()
+        return None
+
+    # Reader lưu cấu hình khi persistence=True → chỉ ghi lại khi khác cấu hình mong muốn.
+    # Reader đã Idle sau STOP của Connect_Reader_And_Initialize → query không gửi STOP lại,
+    # nên nhánh "bỏ qua" chỉ tốn 2 lệnh query thay vì 2 × (STOP/ACK + query)
+    if not config_matches(reader.query_baseband_profile(stop=False), BASEBAND_PROFILE):
+        reader.configure_baseband(**BASEBAND_PROFILE)
+    if not config_matches(reader.query_reader_power(stop=False), ANTENNA_POWER):
+        reader.configure_reader_power(ANTENNA_POWER, persistence=True)
+    else:
+        logger.info("🔧[%s] Antenna power đã đúng cấu hình, bỏ qua", port)
+    # Sau khi cấu hình xong (các lệnh trên cần timeout đọc mặc định)
+    tune_serial_for_latency(reader.uart.ser)
+    return reader
+
+def _offer(tag_q: asyncio.Queue, item: tuple):
+    """Đưa tag vào hàng đợi trên event loop; bỏ tag nếu consumer không theo kịp"""
+    try:
+        tag_q.put_nowait(item)
+    except asyncio.QueueFull:
+        pass
+
+# Lý do kết thúc inventory, index theo mã reason 0..2
+END_REASONS = ("Kết thúc do đọc 1 lần", "Dừng bởi lệnh STOP", "Lỗi phần cứng")
+
+def end_reason_text(reason) -> str:
+    return END_REASONS[reason] if isinstance(reason, int) and 0 <= reason < len(END_REASONS) else "Không rõ"
+
+# ---------- Coroutine cho mỗi UART port ----------
+async def run_reader(port: str, opts: argparse.Namespace, tag_q: asyncio.Queue, stop: asyncio.Event):
+    loop = asyncio.get_running_loop()
+    reader = await loop.run_in_executor(None, open_reader, port, opts.baud)
+    if reader is None:
         return
 
-    # --- Tag callback scoped to this reader ---
+    tag_count = 0
+    unique_epcs = set()
+    port_json = orjson.dumps(port).decode()
+    # (epc, antenna_id) → lần emit gần nhất; bỏ các lần đọc lặp trong dedup_window
+    recent: dict[tuple, float] = {}
+    dedup_window = opts.dedup_window
+    dedup_ttl = max(opts.dedup_ttl, dedup_window)
+    # Đặt chế độ beeper một lần trước inventory, callback chỉ kiểm tra cờ
+    beeper_armed = bool(opts.beep and reader.set_beeper(2))
+
+    # --- Tag callback scoped to this reader (chạy trên thread nhận của NationReader) ---
     def on_tag_callback(tag: dict):
-        nonlocal tag_count, unique_epcs
-        epc = tag.get("epc")
+        nonlocal tag_count
+        # NationReader.parse_epc luôn trả đủ epc (hex in hoa)/antenna_id/rssi → subscript trực tiếp
+        epc = tag["epc"]
+        antenna_id = tag["antenna_id"]
         tag_count += 1
         if epc:
-            unique_epcs.add(epc.upper())
-        payload = {
-            "epc": epc,
-            "rssi": tag.get("rssi"),
-            "antenna_id": tag.get("antenna_id"),
-            "port": port,
-            "total_detected": tag_count,
-            "unique_tags": len(unique_epcs),
-            "status": "tag_detected",
-        }
-        print(json.dumps(payload))
-        return json.dumps(payload)
-
-    # Example configuration (tuỳ chỉnh lại nếu cần)
-    reader.configure_baseband(speed=0, q_value=1, session=0, inventory_flag=0)
-    reader.configure_reader_power({1: 10, 2: 0, 3: 0, 4: 0}, persistence=True)
-
+            unique_epcs.add(epc)
+        if dedup_window > 0:
+            key = (epc, antenna_id)
+            now = time.monotonic()
+            if now - recent.get(key, -dedup_window) < dedup_window:
+                return None
+            recent[key] = now
+            if len(recent) > DEDUP_MAX_KEYS:
+                # Dọn các key đã quá TTL
+                for k in [k for k, t in recent.items() if now - t >= dedup_ttl]:
+                    del recent[k]
+        # Tuple thay cho dict payload; consumer format thẳng ra dòng JSON
+        item = (port_json, epc, tag["rssi"], antenna_id, tag_count, len(unique_epcs))
+        if beeper_armed:
+            beep()
+        # Chỉ chuyển sang event loop; serialize + in do consumer đảm nhiệm
+        loop.call_soon_threadsafe(_offer, tag_q, item)
+        return item
+
+    # Reader tự kết thúc (đọc 1 lần / lỗi phần cứng) → thoát ngay, không chờ Ctrl+C
+    reader_done = asyncio.Event()
+
+    def on_end_callback(reason):
+        logger.info("📴[%s] Inventory kết thúc. Lý do: %s", port, end_reason_text(reason))
+        loop.call_soon_threadsafe(reader_done.set)
+
+    # Windows không select được trên handle serial → giữ thread nhận của NationReader
+    own_reader_loop = fcntl is not None
+    halt = threading.Event()
+    read_task = None
     try:
-        reader.start_inventory_with_mode(antenna_mask=[1,2,3,4], callback=on_tag_callback)
-        while True:                
-            time.sleep(1)
+        reader.start_inventory_with_mode(antenna_mask=[1,2,3,4], callback=on_tag_callback,
+                                         spawn_thread=not own_reader_loop, on_end=on_end_callback)
+        if own_reader_loop:
+            read_task = loop.run_in_executor(None, read_loop, reader, halt, opts.cpu_reader)
+        waiters = [asyncio.create_task(stop.wait()), asyncio.create_task(reader_done.wait())]
+        try:
+            await asyncio.wait(waiters, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for w in waiters:
+                w.cancel()
     except Exception as e:
-        print(f"⚠️[{port}] Error: {e}")
+        logger.error("⚠️[%s] Error: %s", port, e)
     finally:
-        reader.stop_inventory()
+        # Dừng vòng đọc trước để không tranh ACK của lệnh STOP
+        halt.set()
+        if read_task is not None:
+            try:
+                await read_task
+            except Exception as e:
+                logger.error("⚠️[%s] Read loop error: %s", port, e)
+        # Reader đã tự báo read-end thì không cần thêm một vòng STOP/ACK
+        if reader.is_inventory_running():
+            await loop.run_in_executor(None, reader.stop_inventory)
         reader.close()
-        print(f"🔌[{port}] UART closed")
+        logger.info("🔌[%s] UART closed", port)
+
+# ---------- Consumer: in tag ra stdout ----------
+# epc là chuỗi hex, rssi/antenna_id là số → format thẳng, không cần encoder JSON
+TAG_LINE = ('{"epc":"%s","rssi":%s,"antenna_id":%s,"port":%s,'
+            '"total_detected":%d,"unique_tags":%d,"status":"tag_detected"}\n')
+
+def encode_tag(item: tuple) -> bytes:
+    """(port_json, epc, rssi, antenna_id, total, unique) → một dòng JSON"""
+    port_json, epc, rssi, antenna_id, total, unique = item
+    if epc is None or rssi is None or antenna_id is None:
+        # Thiếu trường (vd. không có RSSI) → orjson để ra null đúng chuẩn
+        return orjson.dumps({
+            "epc": epc,
+            "rssi": rssi,
+            "antenna_id": antenna_id,
+            "port": orjson.loads(port_json),
+            "total_detected": total,
+            "unique_tags": unique,
+            "status": "tag_detected",
+        }, option=orjson.OPT_APPEND_NEWLINE)
+    return (TAG_LINE % (epc, rssi, antenna_id, port_json, total, unique)).encode()
+
+# Mỗi lô đã được join sẵn → ghi thẳng fd stdout, không copy qua buffer Python
+TAG_FD = sys.stdout.fileno()
+
+def write_lines(lines: list):
+    sys.stdout.flush()  # Đẩy các dòng print của NationReader ra trước để giữ thứ tự
+    data = memoryview(b"".join(lines))
+    while data:
+        data = data[os.write(TAG_FD, data):]
+
+def drain_lines(tag_q: asyncio.Queue, lines: list):
+    """Lấy hết tag đang chờ, mỗi tag một dòng JSON"""
+    while not tag_q.empty():
+        lines.append(encode_tag(tag_q.get_nowait()))
+    return lines
+
+async def print_tags(tag_q: asyncio.Queue):
+    while True:
+        lines = [encode_tag(await tag_q.get())]
+        # Gom các tag đến trong cửa sổ FLUSH_INTERVAL thành một lần write + flush
+        await asyncio.sleep(FLUSH_INTERVAL)
+        write_lines(drain_lines(tag_q, lines))
 
 # ---------- Entry point ----------
-if __name__ == "__main__":
-    ports = ["/dev/ttyUSB0"] 
-    threads = []
-
-    for p in ports:
-        t = threading.Thread(target=run_reader, args=(p,), daemon=True)
-        t.start()
-        threads.append(t)
+async def main(opts: argparse.Namespace):
+    # Ghim event loop (consumer) trước khi executor tạo thread → các thread kế thừa affinity này
+    pin_current_thread(opts.cpu_main)
+    loop = asyncio.get_running_loop()
+    stop = asyncio.Event()
+
+    def request_stop():
+        logger.info("⛔️  Stopping all readers ...")
+        stop.set()
+
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, request_stop)
+        except NotImplementedError:  # Windows: không hỗ trợ add_signal_handler
+            pass
+
+    if opts.beep:
+        start_beeper()
+
+    tag_q = asyncio.Queue(maxsize=TAG_QUEUE_SIZE)
+    printer = asyncio.create_task(print_tags(tag_q))
+    try:
+        await asyncio.gather(*(run_reader(p, opts, tag_q, stop) for p in opts.ports))
+    finally:
+        printer.cancel()
+        # In nốt các tag còn trong hàng đợi
+        write_lines(drain_lines(tag_q, []))
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Đọc tag từ một hoặc nhiều reader Nation, in JSON mỗi dòng")
+    parser.add_argument("ports", nargs="*", default=["/dev/ttyUSB0"], help="Cổng serial (mặc định /dev/ttyUSB0)")
+    parser.add_argument("--baud", type=int, default=115200)
+    parser.add_argument("--beep", action="store_true", help="Phát beep khi đọc được tag")
+    parser.add_argument("--dedup-window", type=float, default=0.1,
+                        help="Bỏ lần đọc lặp cùng (epc, antenna) trong khoảng này (giây, 0 = tắt)")
+    parser.add_argument("--dedup-ttl", type=float, default=1.0,
+                        help="Tuổi tối đa của key dedup khi dọn bảng (giây)")
+    parser.add_argument("--cpu-main", type=int, default=None,
+                        help="Ghim event loop/consumer vào CPU này (Linux)")
+    parser.add_argument("--cpu-reader", type=int, default=None,
+                        help="Ghim thread đọc UART vào CPU này (Linux)")
+    return parser.parse_args()
 
+if __name__ == "__main__":
+    logging.basicConfig(stream=sys.stderr, level=logging.INFO,
+                        format="%(asctime)s - %(levelname)s - %(message)s")
     try:
-        while True:  # Giữ chương trình chính sống để threads chạy
-            time.sleep(1)
-    except KeyboardInterrupt:
-        print("\n⛔️  Stopping all readers ...")
-        # Threads are daemons → sẽ tự kết thúc khi chương trình chính thoát
+        asyncio.run(main(parse_args()))
+    except KeyboardInterrupt:  # Windows fallback
+        logger.info("⛔️  Stopping all readers ...")
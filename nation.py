@@ -3,6 +3,12 @@ import serial.tools.list_ports
 import time
 
 import threading
+import os
+import select
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
 from enum import IntEnum, unique
 from typing import Callable, Optional,Tuple
 import struct
@@ -114,6 +120,12 @@ class UARTConnection:
         if self.ser:
             self.ser.reset_input_buffer()
 
+    def in_waiting(self) -> int:
+        """
+        Number of bytes already received and waiting in the input buffer.
+        """
+        return self.ser.in_waiting if self.ser and self.ser.is_open else 0
+
     def is_open(self) -> bool:
         return self.ser.is_open if self.ser else False
 
@@ -173,6 +185,12 @@ class NationReader:
         # Init in constructor
         self._ext_ant_masks: dict[int, int] = {i: 0 for i in range(1, 33)}  # Main Ant 1–32
         self.antenna_mask = 0x00000001  # Default to Main Antenna 1 
+        # Trạng thái inventory
+        self._inventory_running = False
+        self._inventory_thread = None
+        self._on_tag = None
+        self._on_inventory_end = None
+        self._feed_buffer = b""
 
 
     def open(self):
@@ -315,7 +333,15 @@ class NationReader:
         - Length field (2 bytes)
         - CRC16-CCITT check
         """
+        return self.extract_frames_with_end(data)[0]
+
+    def extract_frames_with_end(self, data: bytes) -> Tuple[list, int]:
+        """
+        Giống extract_valid_frames nhưng trả thêm vị trí kết thúc của frame hợp lệ cuối cùng
+        (0 nếu không có frame), để cắt buffer đúng chỗ kể cả khi có nhiều frame giống hệt nhau.
+        """
         frames = []
+        end = 0
         i = 0
         while i < len(data):
             if data[i] != 0x5A:
@@ -339,12 +365,13 @@ class NationReader:
 
             if crc_calc == crc_recv:
                 frames.append(frame)
+                end = i + full_len
             else:
                 print(f"⚠️ CRC mismatch at index {i}: expected={hex(crc_calc)}, got={hex(crc_recv)}")
 
             i += full_len
 
-        return frames
+        return frames, end
 
 
     def Connect_Reader_And_Initialize(self) -> bool:
@@ -595,15 +622,17 @@ class NationReader:
             return {"error": f"Parse error: {e}"}
 
     #✅
-    def query_reader_power(self) -> dict[int, int]:
+    def query_reader_power(self, stop: bool = True) -> dict[int, int]:
         """
         Queries the current transmit power settings for all antenna ports.
 
+        :param stop: Gửi STOP trước khi query; False khi caller đã chắc reader đang Idle (tiết kiệm 1 round trip)
         :return: A dictionary where keys are antenna IDs (1-64)
                  and values are power levels in dBm, or an empty dict on failure.
         """
         try:
-            self.stop_inventory()
+            if stop:
+                self.stop_inventory()
             print("🚀 Sending Query Reader Power command...")
             # Use the consistent MID value for querying RFID powers
             command_frame = self.build_frame(MID.QUERY_READER_POWER, payload=b'', rs485=self.rs485)
@@ -736,17 +765,32 @@ class NationReader:
     def is_inventory_running(self):
         return self._inventory_running
 
-    #still work.
-    def start_inventory_with_mode(self, antenna_mask, callback=None) -> bool:
-
+    def wait_inventory(self, timeout: float = None) -> bool:
+        """
+        Chờ thread nhận inventory kết thúc. Trả về True nếu thread đã dừng.
+        (Với eventlet monkey_patch, join nhường hub cho các green thread khác)
+        """
+        thread = self._inventory_thread
+        if thread is None:
+            return True
+        thread.join(timeout)
+        return not thread.is_alive()
 
+    #still work.
+    def start_inventory_with_mode(self, antenna_mask, callback=None, spawn_thread: bool = True,
+                                  on_end=None) -> bool:
+        """
+        :param spawn_thread: False → không tạo thread nhận; caller tự đọc UART và đưa bytes vào feed_bytes()
+        :param on_end: Callback(reason) khi reader báo kết thúc inventory
+        """
         try:
 
             self.stop_inventory()
             
             self._inventory_running = True
             self._on_tag = callback
-            self._on_inventory_end = None
+            self._on_inventory_end = on_end
+            self._feed_buffer = b""
             antenna_mask = self.build_antenna_mask(antenna_mask)
             print("🚀 Starting inventory with antenna mask:", antenna_mask)
             payload = self.build_epc_read_payload(antenna_mask, continuous=True)    
@@ -754,9 +798,9 @@ class NationReader:
             
             self.send(frame)
  
-         
-            self._inventory_thread = threading.Thread(target=self._receive_inventory_loop_optimized)
-            self._inventory_thread.start()
+            if spawn_thread:
+                self._inventory_thread = threading.Thread(target=self._receive_inventory_loop_optimized)
+                self._inventory_thread.start()
             return True
         except Exception as e:
             print(f"❌ Exception in start_inventory_with_mode: {e}")
@@ -774,41 +818,128 @@ class NationReader:
                 if not raw:
                     time.sleep(0.01)
                     continue
-                buffer += raw
-                frames = self.extract_valid_frames(buffer)
-                # Xóa khỏi buffer các bytes đã xử lý thành frame
-                if frames:
-                    last_frame = frames[-1]
-                    idx = buffer.find(last_frame) + len(last_frame)
-                    buffer = buffer[idx:]
-
-                for frame in frames:
-                    try:
-                        parsed = self.parse_frame(frame)
-                        cat = parsed["category"]
-                        mid = parsed["mid"]
-                        if cat == 0x10 or mid == 0x00:  # EPC tag
-                            tag = self.parse_epc(parsed['data'])
-                            if "error" in tag:
-                                # print(f"⚠️ Parse error: {tag['error']}")
-                                continue
-                            else:
-                                if self._on_tag:
-                                    self._on_tag(tag)
-                        elif mid in MID.all_read_end_mids():
-                            reason = parsed['data'][0] if parsed['data'] else None
-                            print(f"✅ Inventory ended. Reason: {reason}")
-                            if self._on_inventory_end:
-                                self._on_inventory_end(reason)
-                            self._inventory_running = False
-                            return
-                    except Exception as e:
-                        # print(f"⚠️ Frame parse error: {e}")
-                        continue
+                buffer, ended = self._dispatch_inventory_frames(buffer + raw)
+                if ended:
+                    return
             except Exception as e:
                 print(f"⚠️ Error in inventory loop: {e}")
                 continue
 
+    def feed_bytes(self, data) -> bool:
+        """
+        Đưa bytes đọc từ bên ngoài (khi start với spawn_thread=False) vào bộ tách frame inventory.
+        Trả về True khi reader báo read-end.
+        """
+        self._feed_buffer, ended = self._dispatch_inventory_frames(self._feed_buffer + bytes(data))
+        return ended
+
+    def _dispatch_inventory_frames(self, buffer: bytes) -> Tuple[bytes, bool]:
+        """
+        Tách frame từ buffer, gọi _on_tag cho từng tag EPC và _on_inventory_end khi gặp read-end.
+        Trả về (bytes chưa thành frame, đã kết thúc inventory hay chưa).
+        """
+        frames, end = self.extract_frames_with_end(buffer)
+        # Xóa khỏi buffer các bytes đã xử lý thành frame (cắt tại cuối frame cuối cùng,
+        # không dùng find() vì tag đọc 2 lần trong 1 chunk cho ra 2 frame giống hệt nhau)
+        buffer = buffer[end:]
+
+        for frame in frames:
+            try:
+                parsed = self.parse_frame(frame)
+                cat = parsed["category"]
+                mid = parsed["mid"]
+                if cat == 0x10 or mid == 0x00:  # EPC tag
+                    tag = self.parse_epc(parsed['data'])
+                    if "error" in tag:
+                        # print(f"⚠️ Parse error: {tag['error']}")
+                        continue
+                    else:
+                        if self._on_tag:
+                            self._on_tag(tag)
+                elif mid in MID.all_read_end_mids():
+                    reason = parsed['data'][0] if parsed['data'] else None
+                    print(f"✅ Inventory ended. Reason: {reason}")
+                    if self._on_inventory_end:
+                        self._on_inventory_end(reason)
+                    self._inventory_running = False
+                    return buffer, True
+            except Exception as e:
+                # print(f"⚠️ Frame parse error: {e}")
+                continue
+        return buffer, False
+
+    def start_inventory_nonblocking(self, antenna_mask, on_tag=None, poll: float = 0.02,
+                                    duration: Optional[float] = None,
+                                    should_stop: Optional[Callable[[], bool]] = None) -> bool:
+        """
+        Chạy inventory ngay trên thread/green thread gọi hàm (không tạo thread riêng).
+        Đọc UART bằng select + os.read trên fd non-blocking nên nhường hub eventlet giữa các lần đọc.
+        Dừng khi stop_inventory() được gọi, `should_stop()` trả True, reader báo read-end,
+        hết `duration` giây hoặc cổng serial lỗi (OSError, vd. fd đã đóng).
+        Trên nền tảng không có fcntl (Windows) fallback về receive() như luồng thường.
+        :param antenna_mask: Danh sách antenna (1-based)
+        :param on_tag: Callback nhận dict tag
+        :param poll: Timeout select mỗi vòng (giây)
+        :param duration: Thời gian chạy tối đa (giây), None = tới khi stop
+        :param should_stop: Hàm kiểm tra mỗi vòng lặp (vd. cờ stop của app), None = bỏ qua
+        """
+        try:
+            self._inventory_running = True
+            self._on_tag = on_tag
+            self._on_inventory_end = None
+            payload = self.build_epc_read_payload(self.build_antenna_mask(antenna_mask), continuous=True)
+            self.send(self.build_frame(mid=MID.READ_EPC_TAG, payload=payload, rs485=self.rs485))
+        except Exception as e:
+            self._inventory_running = False
+            print(f"❌ Exception in start_inventory_nonblocking: {e}")
+            return False
+
+        deadline = time.monotonic() + duration if duration is not None else None
+        try:
+            fd = self.uart.ser.fileno()
+        except Exception:
+            fd = None
+        old_flags = None
+        if fd is not None and fcntl is not None:
+            old_flags = fcntl.fcntl(fd, fcntl.F_GETFL)
+            fcntl.fcntl(fd, fcntl.F_SETFL, old_flags | os.O_NONBLOCK)
+
+        buffer = b""
+        try:
+            while self._inventory_running:
+                if deadline is not None and time.monotonic() >= deadline:
+                    break
+                if should_stop is not None and should_stop():
+                    break
+                try:
+                    if old_flags is not None:
+                        r, _, _ = select.select([fd], [], [], poll)
+                        if not r:
+                            continue
+                        try:
+                            raw = os.read(fd, 4096)
+                        except BlockingIOError:
+                            continue
+                    else:
+                        raw = self.receive(128)
+                        if not raw:
+                            time.sleep(poll)
+                            continue
+                    buffer, ended = self._dispatch_inventory_frames(buffer + raw)
+                    if ended:
+                        break
+                except OSError as e:
+                    # fd đóng/không hợp lệ (EBADF...): thử lại chỉ lặp vô hạn, thoát luôn
+                    print(f"❌ Serial error in inventory loop: {e}")
+                    break
+                except Exception as e:
+                    print(f"⚠️ Error in inventory loop: {e}")
+                    continue
+        finally:
+            if old_flags is not None:
+                fcntl.fcntl(fd, fcntl.F_SETFL, old_flags)
+        return True
+
 
     def query_filter_settings(self):
         """
@@ -968,10 +1099,11 @@ class NationReader:
                 continue
 
 
-    def stop_inventory(self) -> bool:
+    def stop_inventory(self, timeout: float = 1.0) -> bool:
         """
         Sends the Stop command (MID=0xFF) to halt RFID operations and confirm idle state.
         Returns True if the reader acknowledges stop or issues a valid 'read end' notification.
+        :param timeout: Maximum time to wait for the acknowledgement (seconds)
         """
         
         # Step 1: Stop any running inventory thread if needed
@@ -992,44 +1124,63 @@ class NationReader:
         self.send(stop_frame)
 
         # Step 4: Wait for confirmation via response or notification
-        for attempt in range(10):
-            # time.sleep(0.2)
-            try:
-                raw = self.receive(256)
-                frames = self.extract_valid_frames(raw)
-                
+        if self._ack_seen(timeout=timeout):
+            return True
+        print(f"❌ STOP failed: no valid response or reading end notification within {timeout}s.")
+        return False
 
-                for idx, f in enumerate(frames):
-                    try:
-                        resp = self.parse_frame(f)
-                        mid = resp["mid"]
-                        data = resp["data"]
+    def _ack_seen(self, timeout: float = 1.0, poll: float = 0.02) -> bool:
+        """
+        Poll the RX buffer for the STOP response (MID=0xFF) or a 'read end' notification.
+        Returns as soon as the acknowledgement arrives instead of blocking on fixed-size reads.
+        :param timeout: Maximum time to wait for the acknowledgement (seconds)
+        :param poll: Sleep between polls while the RX buffer is empty (seconds)
+        :return: True if the reader confirmed the stop, False on error code or timeout
+        """
+        deadline = time.monotonic() + timeout
+        buffer = b""
+        while time.monotonic() < deadline:
+            try:
+                waiting = self.uart.in_waiting()
+                if not waiting:
+                    time.sleep(poll)
+                    continue
+                buffer += self.receive(waiting)
+            except Exception as e:
+                print(f"⚠️ UART receive error while waiting for STOP: {e}")
+                time.sleep(poll)
+                continue
 
-                        if mid == MID.STOP_OPERATION:  # MID=0xFF, response
-                            result = data[0] if data else -1
-                            if result == 0x00:
-                                print("✅ Reader responded: STOP successful, now IDLE.")
-                                return True
-                            else:
-                                print(f"⚠️ Reader responded: STOP error code {result:#02x}")
-                                return False
-
-                        elif mid in NationReader.all_read_end_mids():
-                            reason = data[0] if data else -1
-                            if reason == 1:
-                                print("✅ Read end notification: stopped by STOP command.")
-                                return True
-                            else:
-                                print(f"↪️ Read ended with reason code {reason}, not STOP command.")
+            frames, end = self.extract_frames_with_end(buffer)
+            buffer = buffer[end:]
 
+            for idx, f in enumerate(frames):
+                try:
+                    resp = self.parse_frame(f)
+                    mid = resp["mid"]
+                    data = resp["data"]
+
+                    if mid == MID.STOP_OPERATION:  # MID=0xFF, response
+                        result = data[0] if data else -1
+                        if result == 0x00:
+                            print("✅ Reader responded: STOP successful, now IDLE.")
+                            return True
                         else:
-                            print(f"🔍 Unrelated frame, MID={mid:#04x}")
-                    except Exception as e:
-                        print(f"❌ Frame parse error [{idx}]: {e}")
-            except Exception as e:
-                print(f"⚠️ UART receive error on attempt {attempt+1}: {e}")
+                            print(f"⚠️ Reader responded: STOP error code {result:#02x}")
+                            return False
+
+                    elif mid in NationReader.all_read_end_mids():
+                        reason = data[0] if data else -1
+                        if reason == 1:
+                            print("✅ Read end notification: stopped by STOP command.")
+                            return True
+                        else:
+                            print(f"↪️ Read ended with reason code {reason}, not STOP command.")
 
-        print("❌ STOP failed: no valid response or reading end notification after 10 attempts.")
+                    else:
+                        print(f"🔍 Unrelated frame, MID={mid:#04x}")
+                except Exception as e:
+                    print(f"❌ Frame parse error [{idx}]: {e}")
         return False
 
     @staticmethod
@@ -2325,13 +2476,15 @@ class NationReader:
             return False
 
 
-    def query_baseband_profile(self) -> dict:
+    def query_baseband_profile(self, stop: bool = True) -> dict:
         """
         Query the current EPC baseband parameters.
         Returns a dict: {speed, q_value, session, inventory_flag}
+        :param stop: Gửi STOP trước khi query; False khi caller đã chắc reader đang Idle
         """
         try:
-            self.stop_inventory()  # Ensure reader is idle before querying
+            if stop:
+                self.stop_inventory()  # Ensure reader is idle before querying
             self.uart.flush_input()
             # MID = 0x0C in category 0x01 (see MID.QUERY_BASEBAND)
             frame = self.build_frame(mid=MID.QUERY_BASEBAND, payload=b'', rs485=False)
@@ -1,16 +1,42 @@
-import json
+# The async server must patch the standard library before anything else imports it, so the
+# requested mode is read straight from the environment here (`config.SOCKETIO_ASYNC_MODE` reads
+# the same variable). `_PATCHED_ASYNC_MODE` stays None if the requested library is not installed.
+import os
+_PATCHED_ASYNC_MODE = None
+if os.environ.get('SOCKETIO_ASYNC_MODE', 'eventlet') == 'eventlet':
+    try:
+        import eventlet
+        eventlet.monkey_patch()
+        _PATCHED_ASYNC_MODE = 'eventlet'
+    except ImportError:
+        pass
+elif os.environ.get('SOCKETIO_ASYNC_MODE') == 'gevent':
+    try:
+        from gevent import monkey
+        monkey.patch_all()
+        _PATCHED_ASYNC_MODE = 'gevent'
+    except ImportError:
+        pass
+
 import logging
+import queue
 import threading
+import itertools
+import functools
 import time
+import zlib
+from array import array
 from collections import deque
-from typing import Dict, List, Optional
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
 
-from flask import Flask, jsonify, render_template, request
+import orjson
+from flask import Flask, Response, render_template, request
+from flask.json.provider import JSONProvider
 from flask_cors import CORS
-from flask_socketio import SocketIO, emit
-# 'serial' and 'serial.tools.list_ports' are imported, but 'serial' itself isn't directly used
-# for the reader object, as NationReader handles the low-level serial communication.
-# 'list_ports' isn't used in the provided code, but kept if you use it elsewhere.
+from flask_socketio import SocketIO, emit, join_room
+# NationReader handles the low-level serial communication; 'serial' is used here for its
+# exception types and 'list_ports' to check that a port exists before opening it.
 import serial 
 from serial.tools import list_ports 
 
@@ -25,57 +51,138 @@ from nation import NationReader
 # Load application configuration based on FLASK_ENV
 config = get_config()
 
+class ORJSONProvider(JSONProvider):
+    """
+    Flask JSON provider backed by `orjson` (used by `request.get_json` and any other Flask JSON helper).
+    `OPT_NON_STR_KEYS` keeps the stdlib behaviour of accepting int keys (e.g. antenna -> power maps).
+    """
+    def dumps(self, obj, **kwargs) -> str:
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+class _SocketIOJSON:
+    """
+    Minimal `json`-module stand-in for Flask-SocketIO's `json=` option.
+    python-socketio calls `dumps(data, separators=...)` and expects `str`, so extra keyword
+    arguments are ignored (orjson output is already compact).
+    The encoder and its options are bound as default arguments, so each packet skips the
+    global/attribute lookups; `loads` is orjson's C function itself (python-socketio calls `loads(s)`).
+    """
+    @staticmethod
+    def dumps(obj, _dumps=orjson.dumps, _option=orjson.OPT_NON_STR_KEYS, **kwargs) -> str:
+        return _dumps(obj, option=_option).decode()
+
+    loads = staticmethod(orjson.loads)
+
+def _json_response(obj) -> Response:
+    """
+    Drop-in replacement for `jsonify` in the route handlers: encodes `obj` directly with orjson
+    into a `Response`, skipping Flask's JSON provider lookup and its str round-trip.
+    """
+    return Response(orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS), mimetype='application/json')
+
 # Initialize Flask app
 app = Flask(__name__)
+# Route Flask's own JSON handling through orjson
+app.json = ORJSONProvider(app)
 # Load configuration from the Config object
 app.config.from_object(config)
 # Enable Cross-Origin Resource Sharing for the Flask app
 CORS(app)  
+# Optional per-request profiling (FLASK_PROFILE=1), to find request-handling hotspots without code edits
+if config.PROFILE_REQUESTS:
+    from werkzeug.middleware.profiler import ProfilerMiddleware
+    app.wsgi_app = ProfilerMiddleware(app.wsgi_app, restrictions=[30], sort_by=('cumulative',))
+# Greenlet modes need their monkey patching to have succeeded above; otherwise fall back to threading
+_ASYNC_MODE = (
+    config.SOCKETIO_ASYNC_MODE
+    if config.SOCKETIO_ASYNC_MODE not in ('eventlet', 'gevent') or _PATCHED_ASYNC_MODE == config.SOCKETIO_ASYNC_MODE
+    else 'threading'
+)
 # Initialize Flask-SocketIO for real-time communication
 socketio = SocketIO(
     app, 
     cors_allowed_origins=config.SOCKETIO_CORS_ALLOWED_ORIGINS, 
-    async_mode=config.SOCKETIO_ASYNC_MODE, 
+    async_mode=_ASYNC_MODE, 
     logger=False, # Flask-SocketIO's own logger is often too verbose
-    engineio_logger=False # Engine.IO's logger is also often too verbose
+    engineio_logger=False, # Engine.IO's logger is also often too verbose
+    json=_SocketIOJSON # Encode/decode every Socket.IO packet with orjson
 )
 
+# --- Config Constants ---
+
+# Frequently used config values bound once to module names, so hot paths read a global
+# instead of going through the Config object on every call.
+_MAX_ANTS = config.MAX_ANTENNAS
+_DEFAULT_BAUD = config.DEFAULT_BAUDRATE
+# Precomputed once from config so request handlers validate with a single C-level set/compare
+_VALID_ANTENNAS = frozenset(range(1, _MAX_ANTS + 1))
+# Chained comparison rather than a `range`: power values may be floats (e.g. 12.5)
+_PWR_LO, _PWR_HI = config.POWER_MIN_DBM, config.POWER_MAX_DBM
+
 # --- Global Variables for Application State ---
 
 # The NationReader instance, accessible globally for convenience (e.g., by helper functions)
 # and managed by RFIDWebController.
 reader: Optional[NationReader] = None 
-# Thread for managing ongoing RFID inventory operations
-inventory_thread: Optional[threading.Thread] = None
+# Background task (green thread or thread, depending on the async mode) running the inventory.
+# It has no portable is_alive/join; use `rfid_controller.inventory_running()` and `_inv_stopped`.
+inventory_thread = None
 # Flag to signal the inventory thread to stop gracefully
 stop_inventory_flag: bool = False
-# A deque (double-ended queue) to store detected tags, with a max length
-# This efficiently handles adding/removing tags for display without re-allocating large lists.
-detected_tags: deque = deque(maxlen=config.MAX_TAGS_DISPLAY)
-# Dictionary to hold overall inventory statistics (e.g., read rate, total count)
-inventory_stats: Dict[str, int] = {"read_rate": 0, "total_count": 0}
-# Set to keep track of connected WebSocket client SIDs
-connected_clients: set = set()
+# Ring buffer of the most recent tags for display (see `TagRing` below; created after its definition)
+detected_tags: "TagRing"
+# Dictionary to hold overall inventory statistics (e.g., read rate, total count, failed Socket.IO emits/handlers)
+# Mutated in place (never rebound) so references held by other threads stay valid.
+inventory_stats: Dict[str, int] = {"read_rate": 0, "total_count": 0, "emit_errors": 0}
+# Source of `inventory_stats["total_count"]`; `next()` on it is atomic under the GIL, unlike `+= 1`
+_tag_counter = itertools.count(1)
+# Socket.IO room that receives the live tag stream; every client joins it on connect.
+# Membership is tracked by python-socketio itself, so no client set is kept here.
+TAGS_ROOM = 'tags'
+# Bounded hand-off between the reader's serial thread (producer) and the flusher task
+# (consumer). The tag callbacks only `put_nowait` into it, so logging and WebSocket I/O
+# never stall the serial read path; when the queue is full the tag is counted as dropped.
+TAG_QUEUE_SIZE = 8192
+tag_q: queue.Queue = queue.Queue(maxsize=TAG_QUEUE_SIZE)
+# Number of tags dropped because `tag_q` was full
+dropped_tags: int = 0
+# Maximum number of tags sent in one 'tag_detected_batch' event
+TAG_BATCH_SIZE = 256
+# Pause between batches so tags arriving close together share one WebSocket frame
+TAG_FLUSH_INTERVAL_SECONDS = 0.05
+# Background task that flushes `tag_q` (started lazily on first inventory)
+tag_flusher_task = None
+# `inventory_stats["read_rate"]` is computed by the flusher from (monotonic_ns, total_count)
+# samples taken every 100 ms; 10 samples give a sliding window of about one second.
+READ_RATE_SAMPLE_INTERVAL_NS = 100_000_000
+_rate_samples: deque = deque(maxlen=10)
+_next_rate_sample_ns: int = 0
 
 # --- Logging Configuration ---
 
-# Configure the root logger for the application
+# Configure the root logger for the application, reusing the formatter the config built once
+_log_handler = logging.StreamHandler()
+_log_handler.setFormatter(config.LOG_FORMATTER)
 logging.basicConfig(
     level=getattr(logging, config.LOG_LEVEL), # Set log level from config (e.g., INFO, DEBUG)
-    format=config.LOG_FORMAT # Set log message format from config
+    handlers=[_log_handler] # Formats with config.LOG_FORMATTER (built from config.LOG_FORMAT)
 )
+# LOG_FORMAT does not use thread/process/source-location fields, so skip collecting them
+# for every record (`_srcfile = None` avoids a stack-frame walk per log call).
+logging.logThreads = False
+logging.logProcesses = False
+logging.logMultiprocessing = False
+logging._srcfile = None
 # Get a logger instance for this module (app.py)
 logger = logging.getLogger(__name__)
+if _ASYNC_MODE != config.SOCKETIO_ASYNC_MODE:
+    logger.warning(f"⚠️ SOCKETIO_ASYNC_MODE '{config.SOCKETIO_ASYNC_MODE}' is not installed; falling back to 'threading' (HTTP long-polling).")
 
 # --- Helper Functions ---
 
-def _get_reader_instance() -> Optional[NationReader]:
-    """
-    Safely retrieves the global NationReader instance.
-    This helper makes sure we're always working with the current reader.
-    """
-    return globals().get('reader')
-
 def _get_profile_from_reader(nation_reader: NationReader) -> Optional[Dict]:
     """
     Retrieves the full operational profile data from the NationReader.
@@ -84,7 +191,7 @@ def _get_profile_from_reader(nation_reader: NationReader) -> Optional[Dict]:
     try:
         profile = nation_reader.GetProfile()
         if profile and isinstance(profile, dict) and not profile.get("error"):
-            logger.debug(f"Reader profile retrieved: {profile}")
+            logger.debug("Reader profile retrieved: %s", profile)
             return profile
         logger.error(f"Failed to retrieve profile or profile has errors: {profile}")
         return None
@@ -92,33 +199,63 @@ def _get_profile_from_reader(nation_reader: NationReader) -> Optional[Dict]:
         logger.error(f"Error getting reader profile: {e}")
         return None
 
+def _build_profile_frames() -> Dict[int, tuple]:
+    """
+    Builds the command frames for every entry of `config.PROFILES` that the reader accepts:
+    profile number -> (CONFIG_BASEBAND frame, (Select Profile frame, same frame for RS485)).
+    Profiles rejected by `select_profile`/`configure_baseband` validation are left out (and logged),
+    so they are refused by `set_profile` instead of being sent to the hardware.
+    """
+    frames: Dict[int, tuple] = {}
+    for profile_num, profile in enumerate(config.PROFILES):
+        if profile is None:
+            continue
+        if profile_num not in NationReader.PROFILE_IDS:
+            logger.warning(f"⚠️ Profile {profile_num} ({profile.name}) skipped: reader profile IDs are {sorted(NationReader.PROFILE_IDS)}.")
+            continue
+        error = NationReader.baseband_params_error(profile.speed, profile.q_value, profile.session, profile.inventory_flag)
+        if error:
+            logger.warning(f"⚠️ Profile {profile_num} ({profile.name}) skipped: {error}")
+            continue
+        frames[profile_num] = (
+            NationReader.build_baseband_frame(
+                speed=profile.speed,
+                q_value=profile.q_value,
+                session=profile.session,
+                inventory_flag=profile.inventory_flag
+            ),
+            # Indexed by the connected reader's `rs485` flag
+            (NationReader.build_select_profile_frame(profile_num, rs485=False),
+             NationReader.build_select_profile_frame(profile_num, rs485=True))
+        )
+    return frames
+
+# PROFILES is static, so applying a profile only has to send these prebuilt bytes
+_PROFILE_FRAMES: Dict[int, tuple] = _build_profile_frames()
+
 def _set_profile_on_reader(nation_reader: NationReader, profile_num: int, save_on_power_down: bool) -> bool:
     """
     Sets a specific predefined operational profile on the NationReader.
-    This function configures baseband settings based on `config.PROFILE_CONFIGS`.
+    This sends the baseband and profile-select frames precompiled from `config.PROFILES`.
     """
-    profile_data = config.PROFILE_CONFIGS.get(profile_num)
-    if not profile_data:
-        logger.error(f"Invalid profile number '{profile_num}'. Not found in config.PROFILE_CONFIGS.")
+    frames = _PROFILE_FRAMES.get(profile_num)
+    if not frames:
+        logger.error(f"Invalid profile number '{profile_num}'. Not found in config.PROFILES.")
         return False
+    baseband_frame, select_frames = frames
 
     try:
         # Configure baseband parameters as part of the profile setting
-        configured_baseband = nation_reader.configure_baseband(
-            speed=profile_data.get("speed", 255), # Default speed if not in profile_data
-            q_value=profile_data.get("q_value", config.DEFAULT_Q_VALUE), # Use config default if not in profile
-            session=profile_data.get("session", config.DEFAULT_SESSION),
-            inventory_flag=profile_data.get("inventory_flag", 0)
-        )
+        configured_baseband = nation_reader.send_baseband_frame(baseband_frame)
         if not configured_baseband:
             logger.error(f"Failed to configure baseband for profile {profile_num}.")
             return False
 
-        # Attempt to select the profile, assuming `nation_reader.select_profile`
+        # Attempt to select the profile, assuming `nation_reader.send_select_profile_frame`
         # handles activating and potentially saving this profile as the active one.
         # Note: Your `nation.py` `select_profile` doesn't currently take `save_on_power_down`.
         # If persistence is needed here, the NationReader method might need modification.
-        selected = nation_reader.select_profile(profile_num)
+        selected = nation_reader.send_select_profile_frame(select_frames[bool(nation_reader.rs485)], profile_num)
         if not selected:
             logger.error(f"Failed to select profile {profile_num} on reader.")
             return False
@@ -130,7 +267,314 @@ def _set_profile_on_reader(nation_reader: NationReader, profile_num: int, save_o
         return False
 
 
+class TagRing:
+    """
+    Fixed-capacity ring buffer of recently detected tags, stored as parallel arrays
+    (structure of arrays) instead of one dict per tag.
+    All storage is preallocated, so appending a tag allocates no per-tag Python objects:
+    the EPC is decoded once into a shared `bytearray`, and RSSI/antenna/timestamp go into
+    typed `array` columns. When full, the oldest tag is overwritten (same as `deque(maxlen=N)`).
+    """
+    # Gen2 EPCs are at most 496 bits (62 bytes); every slot reserves that much EPC space
+    EPC_STRIDE = 62
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.epc = bytearray(capacity * self.EPC_STRIDE)
+        self.epc_len = array('B', bytes(capacity))
+        # RSSI as reported by the reader (0-255); -1 marks a tag read without RSSI
+        self.rssi = array('h', [0]) * capacity
+        self.ant = array('B', bytes(capacity))
+        # Detection time (Unix seconds)
+        self.ts = array('d', [0.0]) * capacity
+        # Next slot to write and number of valid slots
+        self.head = 0
+        self.count = 0
+        # Bumped on every change; used as the ETag and cache key of /api/get_tags
+        self.version = 0
+
+    def __len__(self) -> int:
+        return self.count
+
+    def append(self, epc: Optional[str], rssi: Optional[int], antenna: Optional[int], ts: Optional[float] = None) -> None:
+        """Writes one tag into the next slot, overwriting the oldest tag when the ring is full."""
+        slot = self.head
+        raw = bytes.fromhex(epc)[:self.EPC_STRIDE] if epc else b''
+        offset = slot * self.EPC_STRIDE
+        self.epc[offset:offset + len(raw)] = raw
+        self.epc_len[slot] = len(raw)
+        self.rssi[slot] = -1 if rssi is None else rssi
+        self.ant[slot] = antenna or 0
+        self.ts[slot] = time.time() if ts is None else ts
+        self.head = (slot + 1) % self.capacity
+        if self.count < self.capacity:
+            self.count += 1
+        self.version += 1
+
+    def clear(self) -> None:
+        """Empties the ring. The arrays are kept and simply overwritten by later appends."""
+        self.head = 0
+        self.count = 0
+        self.version += 1
+
+    def snapshot_json(self, limit: Optional[int] = None) -> bytes:
+        """
+        Serializes the buffered tags (oldest first) as a JSON list of
+        `{"epc", "rssi", "antenna", "timestamp"}` objects with "%H:%M:%S" timestamps,
+        i.e. the same tag shape as the root app and the 'tag_detected_batch' event.
+        The columnar storage is converted only here, at the response boundary.
+        With `limit`, only the `limit` most recent tags are serialized; the slots are located
+        by index arithmetic, so the cost depends on `limit` rather than on the ring size.
+        """
+        capacity, stride = self.capacity, self.EPC_STRIDE
+        count = self.count if limit is None else max(0, min(limit, self.count))
+        start = (self.head - count) % capacity
+        epc, epc_len, rssi, ant, ts = self.epc, self.epc_len, self.rssi, self.ant, self.ts
+        # Tags arrive in bursts, so format each distinct second once
+        stamps: Dict[int, str] = {}
+        tags = []
+        for n in range(count):
+            i = (start + n) % capacity
+            second = int(ts[i])
+            stamp = stamps.get(second)
+            if stamp is None:
+                stamp = stamps[second] = time.strftime("%H:%M:%S", time.localtime(second))
+            tags.append({
+                "epc": epc[i * stride:i * stride + epc_len[i]].hex().upper(),
+                "rssi": rssi[i] if rssi[i] >= 0 else None,
+                "antenna": ant[i],
+                "timestamp": stamp,
+            })
+        return orjson.dumps(tags)
+
+@dataclass(slots=True)
+class TagEvent:
+    """
+    One detected tag as handed from the tag callbacks to the flusher task.
+    A slotted dataclass instead of a per-tag dict: smaller, no per-instance hash table, and
+    orjson serializes it natively as `{"epc", "rssi", "antenna", "timestamp"}`, i.e. the same
+    object shape the frontend already reads from 'tag_detected_batch'.
+    """
+    epc: Optional[str]
+    rssi: Optional[int]
+    antenna: Optional[int]
+    # "%H:%M:%S" display time, or None when the inventory mode does not stamp tags
+    timestamp: Optional[str] = None
+
+detected_tags = config.make_tag_buffer(TagRing)
+# Last /api/get_tags body and the (`detected_tags.version`, read rate, total count) it was built from
+_tags_json_cache = {"version": -1, "body": b""}
+
+
+def _reset_inventory_state() -> None:
+    """Clears the tag ring and statistics in place for a new inventory session."""
+    global _tag_counter
+    detected_tags.clear()
+    _tag_counter = itertools.count(1)
+    inventory_stats["read_rate"] = 0
+    inventory_stats["total_count"] = 0
+    inventory_stats["emit_errors"] = 0
+    _rate_samples.clear()
+
+def _port_available(port: str) -> bool:
+    """
+    Cheap pre-check that a serial port exists, so connecting to a missing port fails
+    immediately instead of going through a full open attempt.
+    Ports not enumerated by pyserial (e.g. ptys) are accepted if the device node exists.
+    """
+    if any(p.device == port for p in list_ports.comports(include_links=True)):
+        return True
+    return os.name == 'posix' and os.path.exists(port)
+
+# Integer body fields per endpoint as (key, default, valid range, label, unit).
+# A `None` range skips the range check. Parsed by `_parse_int_fields`.
+_BASEBAND_FIELDS = (
+    ("speed", 0, None, "Speed", ""),
+    ("q_value", config.DEFAULT_Q_VALUE, config.Q_VALUE_RANGE, "Giá trị Q", ""),
+    ("session", config.DEFAULT_SESSION, config.SESSION_RANGE, "Giá trị Session", ""),
+    ("inventory_flag", 0, None, "Inventory flag", ""),
+)
+_TAGS_INVENTORY_FIELDS = _BASEBAND_FIELDS[1:] + (
+    ("scan_time", config.DEFAULT_INVENTORY_SCAN_TIME_SECONDS, config.SCAN_TIME_RANGE, "Thời gian quét", "s"),
+)
+
+# The configuration never changes while the process runs, so the /api/config body (a subset
+# of the config relevant for the frontend) is serialized once at import, with a matching ETag.
+_CONFIG_JSON = orjson.dumps({
+    "success": True,
+    "data": {
+        "default_serial_port": config.DEFAULT_SERIAL_PORT,
+        "default_baudrate": config.DEFAULT_BAUDRATE,
+        "max_power": config.POWER_MAX_DBM,
+        "min_power": config.POWER_MIN_DBM,
+        "max_antennas": config.MAX_ANTENNAS,
+        # Same `{number: {name, speed, ...}}` shape the frontend has always received
+        "profiles": {num: profile._asdict() for num, profile in enumerate(config.PROFILES) if profile is not None},
+        "max_tags_display": config.MAX_TAGS_DISPLAY,
+        "min_session": config.SESSION_MIN,
+        "max_session": config.SESSION_MAX,
+        "min_q_value": config.Q_VALUE_MIN,
+        "max_q_value": config.Q_VALUE_MAX,
+        "min_scan_time_seconds": config.SCAN_TIME_MIN_SECONDS,
+        "max_scan_time_seconds": config.SCAN_TIME_MAX_SECONDS,
+        "default_scan_time_seconds": config.DEFAULT_INVENTORY_SCAN_TIME_SECONDS,
+    },
+}, option=orjson.OPT_NON_STR_KEYS)
+_CONFIG_ETAG = f'"{zlib.crc32(_CONFIG_JSON):08x}"'
+
+def _parse_int_fields(data: Optional[Dict], fields: tuple) -> tuple:
+    """
+    Reads the integer `fields` of an already-decoded JSON body (decoded once by `request.get_json`,
+    i.e. by orjson) in a single pass, applying defaults, casts and range checks.
+    Returns `(values, None)` with the values in field order, or `(None, message)` for the first
+    invalid field. A missing body is treated as empty, so every field takes its default.
+    """
+    data = data or {}
+    values = []
+    for key, default, valid, label, unit in fields:
+        raw = data.get(key, default)
+        try:
+            value = int(raw)
+        except (TypeError, ValueError):
+            return None, f"{label} ({raw}) không hợp lệ."
+        if valid is not None and value not in valid:
+            return None, f"{label} ({value}{unit}) phải từ {valid.start}{unit} đến {valid[-1]}{unit}."
+        values.append(value)
+    return values, None
+
+def _parse_bool(raw: Any) -> bool:
+    """
+    Boolean JSON body field: a real bool as-is; strings '1', 'true' or 'yes' (any case) and the
+    number 1 enable it; anything else ('false', '0', None, ...) does not, unlike `bool("false")`.
+    """
+    if isinstance(raw, bool):
+        return raw
+    if isinstance(raw, str):
+        return raw.strip().lower() in ('1', 'true', 'yes')
+    return raw == 1
+
+def _is_hex_text(raw: Any) -> bool:
+    """True if a JSON body value is a string of hex digits (surrounding whitespace ignored); False for non-strings."""
+    return isinstance(raw, str) and NationReader.is_hex_string(raw.strip())
+
+def _queue_tag(tag_data: TagEvent) -> None:
+    """
+    Hands a detected tag to the flusher task without blocking the caller.
+    Runs on the reader's serial thread, so it must stay cheap: no logging, no encoding.
+    """
+    global dropped_tags
+    try:
+        tag_q.put_nowait(tag_data)
+    except queue.Full:
+        dropped_tags += 1
+
+def _update_read_rate() -> None:
+    """
+    Takes a (monotonic_ns, total_count) sample every `READ_RATE_SAMPLE_INTERVAL_NS` and sets
+    `inventory_stats["read_rate"]` (tags/second) from the oldest sample in the window.
+    Uses integer nanosecond arithmetic up to the final division.
+    """
+    global _next_rate_sample_ns
+    now = time.monotonic_ns()
+    if now < _next_rate_sample_ns:
+        return
+    _next_rate_sample_ns = now + READ_RATE_SAMPLE_INTERVAL_NS
+
+    total = inventory_stats["total_count"]
+    _rate_samples.append((now, total))
+    t0, count0 = _rate_samples[0]
+    if now > t0:
+        inventory_stats["read_rate"] = max(0, (total - count0) * 1_000_000_000 // (now - t0))
+
+def _tag_flusher() -> None:
+    """
+    Background task that consumes `tag_q` and batches tag emits.
+    It waits for a tag, drains up to `TAG_BATCH_SIZE` tags, logs them (DEBUG only)
+    and emits them as a single 'tag_detected_batch' event. Between partial batches it pauses
+    for `TAG_FLUSH_INTERVAL_SECONDS` so bursts of tags are coalesced into one frame.
+    The wait is bounded so the read rate keeps being sampled (and decays to 0) when no tags arrive.
+    """
+    while True:
+        try:
+            batch = [tag_q.get(timeout=READ_RATE_SAMPLE_INTERVAL_NS / 1e9)]
+        except queue.Empty:
+            _update_read_rate()
+            continue
+        while len(batch) < TAG_BATCH_SIZE:
+            try:
+                batch.append(tag_q.get_nowait())
+            except queue.Empty:
+                break
+        _update_read_rate()
+
+        if logger.isEnabledFor(logging.DEBUG):
+            for tag_data in batch:
+                logger.debug("Tag detected: EPC=%s RSSI=%s Antenna=%s TS=%s", tag_data.epc, tag_data.rssi, tag_data.antenna, tag_data.timestamp)
+
+        # Failures go to the shared Socket.IO error sink; the loop must survive a failed emit
+        try:
+            socketio.emit('tag_detected_batch', batch, to=TAGS_ROOM)
+        except Exception as e:
+            handle_socketio_error(e)
+
+        if len(batch) < TAG_BATCH_SIZE:
+            socketio.sleep(TAG_FLUSH_INTERVAL_SECONDS)
+
+def _ensure_tag_flusher() -> None:
+    """Starts the tag flusher background task once."""
+    global tag_flusher_task
+    if tag_flusher_task is None:
+        tag_flusher_task = socketio.start_background_task(_tag_flusher)
+
+@functools.lru_cache(maxsize=512)
+def _antenna_mask(antenna_ids: tuple) -> int:
+    """
+    Memoized `NationReader.build_antenna_mask`. Callers pass `tuple(sorted(set(ids)))` so every
+    ordering of the same antenna selection shares one cache entry.
+    Raises `ValueError` for IDs outside 1-32 (errors are not cached).
+    """
+    return NationReader.build_antenna_mask(antenna_ids)
+
+# Size of the preallocated buffer `_drain_inventory` reads serial data into
+INVENTORY_READ_BUFFER_SIZE = 4096
+# Pause between `_drain_inventory` polls when nothing is buffered; bounds stop latency
+INVENTORY_IDLE_POLL_SECONDS = 0.01
+
+def _drain_inventory(nation_reader: NationReader, deadline: float) -> None:
+    """
+    Reads inventory data straight from the serial port and feeds it to the reader's frame parser
+    (`NationReader.feed_bytes`), for an inventory started with `spawn_thread=False`.
+    Each iteration does a single read sized to what the driver already has buffered, into one
+    preallocated buffer, instead of fixed 128-byte reads from a separate reception thread.
+    When nothing is buffered it sleeps `INVENTORY_IDLE_POLL_SECONDS` instead of blocking for the
+    serial timeout, so a stop request is noticed within one poll interval.
+    Returns at `deadline` (a `time.monotonic()` value), when `stop_inventory_flag` is set, or when
+    the reader reports the end of the inventory.
+    """
+    ser = nation_reader.uart.ser
+    lock = nation_reader.uart.lock
+    buf = bytearray(INVENTORY_READ_BUFFER_SIZE)
+    view = memoryview(buf)
+    while not stop_inventory_flag and time.monotonic() < deadline:
+        # Hold the UART lock like `UARTConnection.receive`, and re-check the running flag under it,
+        # so a concurrent `stop_inventory` never competes with this loop for its reply bytes.
+        with lock:
+            if not nation_reader.is_inventory_running():
+                return
+            waiting = ser.in_waiting
+            n = ser.readinto(view[:min(waiting, INVENTORY_READ_BUFFER_SIZE)]) if waiting else 0
+        if not n:
+            # Idle port: yield outside the lock, then re-check the stop flag and deadline
+            socketio.sleep(INVENTORY_IDLE_POLL_SECONDS)
+            continue
+        if nation_reader.feed_bytes(view[:n]):
+            return
+
+
 class RFIDWebController:
+    # Fixed attribute set: no per-instance __dict__, and attribute reads are direct slot loads
+    __slots__ = ('_reader_instance', 'is_connected', 'current_profile', 'antenna_power', '_inv_stopped')
+
     def __init__(self):
         # Internal NationReader instance, managed by the controller
         self._reader_instance: Optional[NationReader] = None 
@@ -140,6 +584,13 @@ class RFIDWebController:
         self.current_profile: Optional[Dict] = None 
         # Cached current antenna power settings
         self.antenna_power: Dict[int, int] = {} 
+        # Set whenever no inventory worker is running; workers clear it on start and set it on exit
+        self._inv_stopped = threading.Event()
+        self._inv_stopped.set()
+
+    def inventory_running(self) -> bool:
+        """True while an inventory worker task is running."""
+        return not self._inv_stopped.is_set()
         
     def connect(self, port: str, baudrate: Optional[int] = None) -> Dict:
         """
@@ -151,15 +602,28 @@ class RFIDWebController:
 
         # Use default baudrate from config if not provided
         if baudrate is None:
-            baudrate = config.DEFAULT_BAUDRATE
+            baudrate = _DEFAULT_BAUD
+        # Values come straight from the JSON body: reject bad types up front with a normal error response
+        if not isinstance(port, str) or not port:
+            logger.error(f"Connection error: invalid port {port!r}.")
+            return {"success": False, "message": f"Lỗi kết nối: cổng không hợp lệ ({port!r})"}
+        try:
+            baudrate = int(baudrate)
+        except (ValueError, TypeError):
+            logger.error(f"Connection error to {port}: invalid baudrate {baudrate!r}.")
+            return {"success": False, "message": f"Lỗi kết nối: baudrate không hợp lệ ({baudrate!r})"}
         
         logger.info(f"Attempting to connect to RFID reader on {port} at {baudrate} bps.")
+        # Fail fast on a missing port, before touching any existing connection
+        if not _port_available(port):
+            logger.error(f"Connection error to {port}: port not found.")
+            return {"success": False, "message": f"Lỗi kết nối: không tìm thấy cổng {port}"}
+
         try:
             # If already connected, disconnect cleanly before establishing a new connection
             if self.is_connected and self._reader_instance:
                 logger.info("Existing reader connection found, attempting to disconnect first for a clean reconnect.")
-                self.disconnect() 
-                time.sleep(0.1) # Small delay for cleanup
+                self.disconnect() # Closes the port synchronously; no settle delay needed
 
             # Create a new NationReader instance and open the connection
             self._reader_instance = NationReader(port, baudrate)
@@ -169,7 +633,9 @@ class RFIDWebController:
             reader = self._reader_instance 
             logger.info(f"Successfully connected to RFID reader on {port}.")
             return {"success": True, "message": f"Đã kết nối thành công đến {port}"}
-        except Exception as e:
+        # UARTConnection.open reports open failures (busy/unplugged port) as RuntimeError;
+        # pyserial raises ValueError/TypeError for out-of-range settings (e.g. a negative baudrate)
+        except (serial.SerialException, RuntimeError, OSError, ValueError, TypeError) as e:
             logger.error(f"Connection error to {port}: {e}")
             # Ensure state is reset on failure
             self.is_connected = False
@@ -187,10 +653,11 @@ class RFIDWebController:
         try:
             if self._reader_instance:
                 # Stop any active inventory thread before disconnecting the reader
-                if inventory_thread and inventory_thread.is_alive():
+                if self.inventory_running():
                     logger.info("Inventory thread is active, attempting to stop it before disconnection.")
                     self.stop_inventory() 
-                    time.sleep(0.5) # Allow time for the thread to stop
+                    # Returns as soon as the worker has exited (no fixed delay)
+                    self._inv_stopped.wait(timeout=3.0)
 
                 self._reader_instance.close() # Close the serial port
             
@@ -268,21 +735,20 @@ class RFIDWebController:
         This spawns a background thread to handle tag callbacks.
         """
         # Access global variables for thread management and shared data
-        global inventory_thread, stop_inventory_flag, detected_tags, inventory_stats
+        global inventory_thread, stop_inventory_flag
 
         if not self.is_connected or not self._reader_instance:
             return {"success": False, "message": "Chưa kết nối đến reader"}
 
         # Prevent starting multiple inventory threads concurrently
-        if inventory_thread and inventory_thread.is_alive():
+        if self.inventory_running():
             logger.warning("Inventory thread is already running. Ignoring new start request.")
             return {"success": False, "message": "Inventory đang chạy"}
 
         try:
             # Reset state for a new inventory session
             stop_inventory_flag = False 
-            detected_tags.clear() # Clear tags from previous runs
-            inventory_stats = {"read_rate": 0, "total_count": 0} # Reset statistics
+            _reset_inventory_state() # Clear tags and statistics from previous runs
 
             # Flush input buffer to clear any old data before starting
             try:
@@ -293,21 +759,18 @@ class RFIDWebController:
             def tag_callback(tag_data: Dict) -> None:
                 """
                 Callback function executed by the NationReader when a new tag is detected.
-                It logs the tag, adds it to the `detected_tags` deque, and emits it via WebSocket.
+                It adds the tag to the `detected_tags` ring and hands it to the flusher task,
+                which does the logging and WebSocket emit off the serial thread.
                 """
-                logger.info(f"🔍 Tag detected: EPC={tag_data.get('epc')}, RSSI={tag_data.get('rssi')}, Antenna={tag_data.get('antenna_id')}, TS={tag_data.get('timestamp')}")
-                
-                # Add tag to the deque; `maxlen` handles automatic popping of old tags
-                detected_tags.append(tag_data)
+                tag = TagEvent(tag_data.get('epc'), tag_data.get('rssi'), tag_data.get('antenna_id'))
+                # Add tag to the ring; the oldest tag is overwritten once it is full
+                detected_tags.append(tag.epc, tag.rssi, tag.antenna)
                 
-                # Update total tag count
-                inventory_stats["total_count"] += 1
+                # Update total tag count (race-free: the counter hands out each value once)
+                inventory_stats["total_count"] = next(_tag_counter)
 
-                # Emit tag data to all connected WebSocket clients
-                try:
-                    socketio.emit('tag_detected', tag_data)
-                except Exception as e:
-                    logger.error(f"❌ WebSocket emit failed in tag_callback: {e}")
+                # Hand off to the flusher task (see `_tag_flusher`)
+                _queue_tag(tag)
 
             def inventory_worker() -> None:
                 """
@@ -315,22 +778,29 @@ class RFIDWebController:
                 It calls the NationReader's inventory method with the tag callback.
                 """
                 logger.info("Inventory worker thread started.")
+                nation_reader = self._reader_instance
                 try:         
-                    # Start inventory using the NationReader's method.
-                    # This call is expected to block until inventory is explicitly stopped
-                    # or an end condition is met internally by NationReader.
-                    self._reader_instance.start_inventory_with_mode(
-                        antenna_mask=[1],
+                    # `start_inventory_with_mode` returns once its reception thread is running, so
+                    # block on that thread: the worker (and `inventory_running()`) must outlive the
+                    # run until `stop_inventory` or a 'read end' notification ends it.
+                    if nation_reader.start_inventory_with_mode(
+                        antenna_mask=NationReader.antenna_ids_from_mask(antenna_mask, _MAX_ANTS),
                         callback=tag_callback
-                    )
+                    ):
+                        nation_reader.wait_inventory()
+                    else:
+                        logger.error("Reader refused to start inventory.")
                 except Exception as e:
                     logger.error(f"Inventory worker encountered an unhandled error: {e}")
                 finally:
                     logger.info("Inventory worker thread finished.")
+                    self._inv_stopped.set()
 
-            # Create and start the inventory thread as a daemon so it exits with the main app
-            inventory_thread = threading.Thread(target=inventory_worker, daemon=True)
-            inventory_thread.start()
+            _ensure_tag_flusher()
+            self._inv_stopped.clear()
+
+            # Run the worker as a Socket.IO background task so it is scheduled by the server's async mode
+            inventory_thread = socketio.start_background_task(inventory_worker)
 
             logger.info("RFID inventory process successfully started in a background thread.")
             return {"success": True, "message": "Inventory đã bắt đầu"}
@@ -361,10 +831,9 @@ class RFIDWebController:
                 # We'll still proceed to try and join the thread.
             
             # Wait for the inventory worker thread to complete its execution
-            if inventory_thread and inventory_thread.is_alive():
+            if self.inventory_running():
                 logger.info("Waiting for the inventory worker thread to terminate (max 3 seconds).")
-                inventory_thread.join(timeout=3.0) 
-                if inventory_thread.is_alive():
+                if not self._inv_stopped.wait(timeout=3.0):
                     logger.warning("Inventory thread did not terminate within the specified timeout. It might be stuck.")
                     # In a production system, you might implement more aggressive cleanup or alerts here.
             else:
@@ -376,18 +845,20 @@ class RFIDWebController:
             logger.error(f"Error stopping inventory: {e}")
             return {"success": False, "message": f"Lỗi: {str(e)}"}
     
-    def set_power(self, antenna_powers: Dict[int, int], preserve_config: bool = True) -> Dict:
+    def set_power(self, antenna_powers: Dict[int, int], preserve_config: bool = True, verify: bool = False) -> Dict:
         """
         Configures the RF transmit power levels for specified antenna ports.
         Allows setting power for multiple antennas at once.
+        The cached `antenna_power` is updated from the values just written; pass `verify=True`
+        to re-read all power levels from the reader instead (one extra serial round-trip).
         """
         if not self.is_connected or not self._reader_instance:
             return {"success": False, "message": "Chưa kết nối đến reader"}
         
         # Validate power levels against configured min/max ranges
         for ant, power in antenna_powers.items():
-            if not config.POWER_MIN_DBM <= power <= config.POWER_MAX_DBM:
-                return {"success": False, "message": f"Công suất Antenna {ant} ({power} dBm) phải nằm trong khoảng từ {config.POWER_MIN_DBM} đến {config.POWER_MAX_DBM} dBm."}
+            if not _PWR_LO <= power <= _PWR_HI:
+                return {"success": False, "message": f"Công suất Antenna {ant} ({power} dBm) phải nằm trong khoảng từ {_PWR_LO} đến {_PWR_HI} dBm."}
         
         try:
             # Delegate the power configuration to the NationReader
@@ -395,8 +866,11 @@ class RFIDWebController:
             
             if result:
                 logger.info(f"Set power successfully for antennas: {antenna_powers} dBm. Persistence: {preserve_config}.")
-                # Update the controller's cached antenna power by querying the reader again
-                self.antenna_power = self._reader_instance.query_reader_power() 
+                # The reader acknowledged the write, so the requested values are authoritative
+                if verify:
+                    self.antenna_power = self._reader_instance.query_reader_power()
+                else:
+                    self.antenna_power.update(antenna_powers)
                 return {"success": True, "message": f"Đã thiết lập công suất: {antenna_powers} dBm"}
             else:
                 logger.warning(f"Failed to set power for antennas: {antenna_powers} dBm.")
@@ -483,7 +957,7 @@ class RFIDWebController:
             return {"success": False, "message": "Chưa kết nối đến reader"}
         
         # Validate if the profile number exists in the config
-        if profile_num not in config.PROFILE_CONFIGS:
+        if profile_num not in _PROFILE_FRAMES:
             return {"success": False, "message": f"Profile số {profile_num} không hợp lệ hoặc không có trong cấu hình."}
         
         logger.info(f"Attempting to set reader profile to number {profile_num}. Save on power down: {save_on_power_down}.")
@@ -510,24 +984,18 @@ class RFIDWebController:
             return {"success": False, "message": "Chưa kết nối đến reader"}
 
         # Validate antenna IDs against the maximum supported antennas from config
-        if not all(1 <= ant <= config.MAX_ANTENNAS for ant in antennas):
-            return {"success": False, "message": f"Antenna ID phải nằm trong khoảng từ 1 đến {config.MAX_ANTENNAS}."}
+        if not _VALID_ANTENNAS.issuperset(antennas):
+            return {"success": False, "message": f"Antenna ID phải nằm trong khoảng từ 1 đến {_MAX_ANTS}."}
 
         logger.info(f"Attempting to enable antennas: {antennas}. Save on power down: {save_on_power_down}.")
         try:
-            success_count = 0
-            for ant_id in antennas:
-                if self._reader_instance.enable_ant(ant_id, save_on_power_down):
-                    success_count += 1
-                else:
-                    logger.warning(f"Failed to enable antenna {ant_id}.")
-            
-            if success_count == len(antennas):
+            # One mask query plus one mask write, instead of a query/write pair per antenna
+            mask = _antenna_mask(tuple(sorted(set(antennas))))
+            current_mask = self._reader_instance.query_enabled_ant_mask()
+            # The mask is written atomically, so the antennas are either all enabled or none are
+            if self._reader_instance.set_antenna_mask(current_mask | mask, save_on_power_down):
                 logger.info(f"All specified antennas ({antennas}) enabled successfully.")
                 return {"success": True, "message": f"Đã bật antennas: {antennas}"}
-            elif success_count > 0:
-                logger.warning(f"Partially enabled antennas: {success_count} out of {len(antennas)} succeeded.")
-                return {"success": True, "message": f"Đã bật một số antennas ({success_count}/{len(antennas)})"}
             else:
                 logger.error(f"Failed to enable any of the antennas in the list: {antennas}.")
                 return {"success": False, "message": f"Không thể bật bất kỳ antennas nào trong danh sách: {antennas}"}
@@ -543,24 +1011,18 @@ class RFIDWebController:
             return {"success": False, "message": "Chưa kết nối đến reader"}
 
         # Validate antenna IDs
-        if not all(1 <= ant <= config.MAX_ANTENNAS for ant in antennas):
-            return {"success": False, "message": f"Antenna ID phải nằm trong khoảng từ 1 đến {config.MAX_ANTENNAS}."}
+        if not _VALID_ANTENNAS.issuperset(antennas):
+            return {"success": False, "message": f"Antenna ID phải nằm trong khoảng từ 1 đến {_MAX_ANTS}."}
 
         logger.info(f"Attempting to disable antennas: {antennas}. Save on power down: {save_on_power_down}.")
         try:
-            success_count = 0
-            for ant_id in antennas:
-                if self._reader_instance.disable_ant(ant_id, save_on_power_down):
-                    success_count += 1
-                else:
-                    logger.warning(f"Failed to disable antenna {ant_id}.")
-            
-            if success_count == len(antennas):
+            # One mask query plus one mask write, instead of a query/write pair per antenna
+            mask = _antenna_mask(tuple(sorted(set(antennas))))
+            current_mask = self._reader_instance.query_enabled_ant_mask()
+            # The mask is written atomically, so the antennas are either all disabled or none are
+            if self._reader_instance.set_antenna_mask(current_mask & ~mask, save_on_power_down):
                 logger.info(f"All specified antennas ({antennas}) disabled successfully.")
                 return {"success": True, "message": f"Đã tắt antennas: {antennas}"}
-            elif success_count > 0:
-                logger.warning(f"Partially disabled antennas: {success_count} out of {len(antennas)} succeeded.")
-                return {"success": True, "message": f"Đã tắt một số antennas ({success_count}/{len(antennas)})"}
             else:
                 logger.error(f"Failed to disable any of the antennas in the list: {antennas}.")
                 return {"success": False, "message": f"Không thể tắt bất kỳ antennas nào trong danh sách: {antennas}"}
@@ -576,8 +1038,8 @@ class RFIDWebController:
             return {"success": False, "message": "Chưa kết nối đến reader"}
         
         # Validate antenna power against configured range
-        if not config.POWER_MIN_DBM <= power <= config.POWER_MAX_DBM: 
-            return {"success": False, "message": f"Công suất ({power} dBm) phải nằm trong khoảng từ {config.POWER_MIN_DBM} đến {config.POWER_MAX_DBM} dBm."}
+        if not _PWR_LO <= power <= _PWR_HI: 
+            return {"success": False, "message": f"Công suất ({power} dBm) phải nằm trong khoảng từ {_PWR_LO} đến {_PWR_HI} dBm."}
         
         logger.info(f"Attempting to set power for antenna {antenna} to {power} dBm. Persistence: {preserve_config}.")
         try:
@@ -596,31 +1058,37 @@ class RFIDWebController:
         """
         Sets the RF transmit power for multiple antenna ports at once.
         Input `powers` dict has string keys (antenna IDs) and integer values (power).
+        The entries are validated in one pass straight into a flat `array('B')` of
+        `[antenna ID, power]` pairs, which is handed to the reader without building another dict.
         """
         if not self.is_connected or not self._reader_instance:
             return {"success": False, "message": "Chưa kết nối đến reader"}
         logger.info(f"Attempting to set power for multiple antennas: {powers}. Persistence: {preserve_config}.")
         try:
-            # Convert string keys (from JSON) to integer antenna IDs
-            powers_int: Dict[int, int] = {}
+            # Convert string keys (from JSON) to integer antenna IDs, interleaved with their power
+            pairs = array('B')
             for k_str, v_val in powers.items():
                 try:
                     ant_id = int(k_str)
                     power_val = int(v_val) # Ensure power value is an integer
-                    # Validate power value against configured range
-                    if not config.POWER_MIN_DBM <= power_val <= config.POWER_MAX_DBM:
-                         return {"success": False, "message": f"Công suất Antenna {ant_id} ({power_val} dBm) phải nằm trong khoảng từ {config.POWER_MIN_DBM} đến {config.POWER_MAX_DBM} dBm."}
-                    powers_int[ant_id] = power_val
-                except ValueError:
+                except (TypeError, ValueError):
                     return {"success": False, "message": f"Antenna ID '{k_str}' hoặc giá trị công suất '{v_val}' không hợp lệ. Vui lòng kiểm tra định dạng."}
-
-            # Delegate to NationReader's configure_reader_power
-            result = self._reader_instance.configure_reader_power(powers_int, persistence=preserve_config)
+                # Antenna IDs the protocol accepts (1-64)
+                if not 1 <= ant_id <= 64:
+                    return {"success": False, "message": f"Antenna ID {ant_id} phải từ 1 đến 64."}
+                # Validate power value against configured range
+                if not _PWR_LO <= power_val <= _PWR_HI:
+                    return {"success": False, "message": f"Công suất Antenna {ant_id} ({power_val} dBm) phải nằm trong khoảng từ {_PWR_LO} đến {_PWR_HI} dBm."}
+                pairs.append(ant_id)
+                pairs.append(power_val)
+
+            # Delegate to NationReader, passing the validated pairs as a zero-copy view
+            result = self._reader_instance.configure_reader_power_pairs(memoryview(pairs), persistence=preserve_config)
             if result:
-                logger.info(f"Power successfully set for multiple antennas: {powers_int}.")
+                logger.info(f"Power successfully set for multiple antennas: {powers}.")
                 return {"success": True, "message": "Đã thiết lập công suất cho tất cả antennas"}
             else:
-                logger.warning(f"Failed to set power for multiple antennas: {powers_int}.")
+                logger.warning(f"Failed to set power for multiple antennas: {powers}.")
                 return {"success": False, "message": "Không thể thiết lập công suất"}
         except Exception as e:
             logger.error(f"Error setting power for multiple antennas: {e}")
@@ -645,6 +1113,10 @@ class RFIDWebController:
         if not self.is_connected or not self._reader_instance:
             return {"success": False, "message": "Chưa kết nối đến reader"}
 
+        # Reject malformed hex here instead of after a serial round-trip to the reader
+        if not _is_hex_text(new_epc_hex) or not _is_hex_text(target_tag_epc):
+            return {"success": False, "message": "EPC chỉ được chứa ký tự hex (0-9, A-F)."}
+
         logger.info(f"Attempting to write EPC '{new_epc_hex}' to target tag '{target_tag_epc}'.")
         try:
             # The `NationReader.write_epc_to_target_auto` method in the translated code
@@ -698,11 +1170,11 @@ def api_connect() -> Dict:
     data = request.get_json()
     # Use config.DEFAULT_SERIAL_PORT for consistency with the config.py definition
     port = data.get('port', config.DEFAULT_SERIAL_PORT) 
-    baudrate = data.get('baudrate', config.DEFAULT_BAUDRATE)
+    baudrate = data.get('baudrate', _DEFAULT_BAUD)
     
     logger.info(f"API Connect request received: Port='{port}', Baudrate={baudrate}.")
     result = rfid_controller.connect(port, baudrate)
-    return jsonify(result)
+    return _json_response(result)
 
 @app.route('/api/disconnect', methods=['POST'])
 def api_disconnect() -> Dict:
@@ -711,7 +1183,7 @@ def api_disconnect() -> Dict:
     """
     logger.info("API Disconnect request received.")
     result = rfid_controller.disconnect()
-    return jsonify(result)
+    return _json_response(result)
 
 @app.route('/api/reader_info', methods=['GET'])
 def api_reader_info() -> Dict:
@@ -720,7 +1192,7 @@ def api_reader_info() -> Dict:
     """
     logger.info("API Get Reader Info request received.")
     result = rfid_controller.get_reader_info()
-    return jsonify(result)
+    return _json_response(result)
 
 @app.route('/api/start_inventory', methods=['POST'])
 def api_start_inventory() -> Dict:
@@ -732,22 +1204,47 @@ def api_start_inventory() -> Dict:
     # Expects a list of antenna IDs, default to [1] if not provided
     selected_antennas_raw = data.get('selectedAntennas', [config.DEFAULT_ANTENNA_ID]) 
     
-    if not rfid_controller.is_connected or not _get_reader_instance():
-        return jsonify({"success": False, "message": "Chưa kết nối đến reader."})
+    if not rfid_controller.is_connected or not reader:
+        return _json_response({"success": False, "message": "Chưa kết nối đến reader."})
 
     try:
-        # Build the 32-bit antenna mask from the list of selected antenna IDs
-        reader_instance = _get_reader_instance()
-        antenna_mask_int = reader_instance.build_antenna_mask(selected_antennas_raw)
+        # Build the 32-bit antenna mask from the list of selected antenna IDs (memoized per selection)
+        antenna_mask_int = _antenna_mask(tuple(sorted(set(selected_antennas_raw))))
         logger.info(f"API Start Inventory request: Antennas {selected_antennas_raw} -> Mask 0x{antenna_mask_int:08X}.")
         result = rfid_controller.start_inventory(antenna_mask_int)
-        return jsonify(result)
+        return _json_response(result)
     except ValueError as ve:
         logger.error(f"Invalid antenna ID in mask for start inventory: {ve}")
-        return jsonify({"success": False, "message": f"Lỗi tham số antenna: {ve}"})
+        return _json_response({"success": False, "message": f"Lỗi tham số antenna: {ve}"})
     except Exception as e:
         logger.error(f"Error in API Start Inventory: {e}")
-        return jsonify({"success": False, "message": f"Lỗi: {str(e)}"})
+        return _json_response({"success": False, "message": f"Lỗi: {str(e)}"})
+
+@app.route('/api/get_tags', methods=['GET'])
+def api_get_tags() -> Response:
+    """
+    API endpoint returning the most recently detected tags (up to `config.MAX_TAGS_DISPLAY`)
+    and the inventory statistics. Tags are returned oldest first as `{epc, rssi, antenna, timestamp}` objects.
+    Optional query parameter `limit` returns only the N most recent tags (not cached).
+    The body is serialized once per (`detected_tags.version`, read rate, total count) and reused by later polls;
+    clients sending the current ETag in `If-None-Match` get an empty 304 response.
+    """
+    # total_count too: with `dedup`, repeated reads bump it without touching the ring
+    version = (detected_tags.version, inventory_stats["read_rate"], inventory_stats["total_count"])
+    etag = f'W/"{version[0]}-{version[1]}-{version[2]}"'
+    if request.headers.get('If-None-Match') == etag:
+        return Response(status=304, headers={'ETag': etag})
+
+    limit = request.args.get('limit', type=int)
+    if limit is not None:
+        body = b'{"success":true,"stats":' + orjson.dumps(inventory_stats) + b',"tags":' + detected_tags.snapshot_json(limit) + b'}'
+        return Response(body, mimetype='application/json', headers={'ETag': etag})
+
+    cache = _tags_json_cache
+    if cache["version"] != version:
+        cache["body"] = b'{"success":true,"stats":' + orjson.dumps(inventory_stats) + b',"tags":' + detected_tags.snapshot_json() + b'}'
+        cache["version"] = version
+    return Response(cache["body"], mimetype='application/json', headers={'ETag': etag})
 
 @app.route('/api/stop_inventory', methods=['POST'])
 def api_stop_inventory() -> Dict:
@@ -756,7 +1253,7 @@ def api_stop_inventory() -> Dict:
     """
     logger.info("API Stop Inventory request received.")
     result = rfid_controller.stop_inventory()
-    return jsonify(result)
+    return _json_response(result)
 
 @app.route('/api/stop_tags_inventory', methods=['POST'])
 def api_stop_tags_inventory() -> Dict:
@@ -768,32 +1265,33 @@ def api_stop_tags_inventory() -> Dict:
     
     logger.info("API Stop Tags Inventory request received.")
     if not rfid_controller.is_connected:
-        return jsonify({"success": False, "message": "Chưa kết nối đến reader."})
+        return _json_response({"success": False, "message": "Chưa kết nối đến reader."})
     
     try:
         # Signal the worker thread to stop
         stop_inventory_flag = True
         
         # Explicitly send stop command to the reader via the NationReader instance
-        reader_instance = _get_reader_instance()
+        reader_instance = reader
         if reader_instance:
             logger.info("Sending stop command to reader from api_stop_tags_inventory.")
-            reader_instance.stop_inventory()
-            time.sleep(0.1) # Brief pause for command processing
+            # `NationReader.stop_inventory` returns once the reader acknowledges the stop (or its
+            # retries run out), so no settle delay is needed before waiting for the worker
+            if not reader_instance.stop_inventory():
+                logger.warning("Reader did not acknowledge the stop command; still waiting for the worker to finish.")
 
         # Wait for the inventory worker thread to gracefully terminate
-        if inventory_thread and inventory_thread.is_alive():
+        if rfid_controller.inventory_running():
             logger.info("Waiting for custom tags inventory thread to finish (max 3 seconds).")
-            inventory_thread.join(timeout=3.0)  
-            if inventory_thread.is_alive():
+            if not rfid_controller._inv_stopped.wait(timeout=3.0):
                 logger.warning("Custom tags inventory thread did not terminate within timeout.")
-                return jsonify({"success": False, "message": "Inventory thread không dừng trong thời gian chờ."})
+                return _json_response({"success": False, "message": "Inventory thread không dừng trong thời gian chờ."})
         
         logger.info("Custom tags inventory successfully stopped.")
-        return jsonify({"success": True, "message": "Đã dừng tags inventory thành công."})
+        return _json_response({"success": True, "message": "Đã dừng tags inventory thành công."})
     except Exception as e:
         logger.error(f"Error in API Stop Tags Inventory: {e}")
-        return jsonify({"success": False, "message": f"Lỗi: {str(e)}"})
+        return _json_response({"success": False, "message": f"Lỗi: {str(e)}"})
 
 @app.route('/api/set_power', methods=['POST'])
 def api_set_power() -> Dict:
@@ -815,7 +1313,7 @@ def api_set_power() -> Dict:
         antenna = data.get('antenna', config.DEFAULT_ANTENNA_ID)
         logger.info(f"API Set Power request for single antenna {antenna} at {power} dBm. Persistence: {preserve_config}.")
         result = rfid_controller.set_power_for_antenna(antenna, power, preserve_config)
-    return jsonify(result)
+    return _json_response(result)
 
 @app.route('/api/set_buzzer', methods=['POST'])
 def api_set_buzzer() -> Dict:
@@ -827,7 +1325,7 @@ def api_set_buzzer() -> Dict:
     enable = data.get('enable', True)
     logger.info(f"API Set Buzzer request: enable={enable}.")
     result = rfid_controller.set_buzzer(enable)
-    return jsonify(result)
+    return _json_response(result)
 
 @app.route('/api/get_profile', methods=['GET'])
 def api_get_profile() -> Dict:
@@ -836,7 +1334,7 @@ def api_get_profile() -> Dict:
     """
     logger.info("API Get Profile request received.")
     result = rfid_controller.get_current_profile_data()
-    return jsonify(result)
+    return _json_response(result)
 
 @app.route('/api/set_profile', methods=['POST'])
 def api_set_profile() -> Dict:
@@ -849,7 +1347,7 @@ def api_set_profile() -> Dict:
     save_on_power_down = data.get('save_on_power_down', True)
     logger.info(f"API Set Profile request: Profile Number={profile_num}, Save on power down={save_on_power_down}.")
     result = rfid_controller.set_profile_by_number(profile_num, save_on_power_down)
-    return jsonify(result)
+    return _json_response(result)
 
 @app.route('/api/get_enabled_antennas', methods=['GET'])
 def api_get_enabled_antennas() -> Dict:
@@ -857,19 +1355,21 @@ def api_get_enabled_antennas() -> Dict:
     API endpoint to retrieve a list of currently enabled antenna ports.
     """
     logger.info("API Get Enabled Antennas request received.")
-    if not rfid_controller.is_connected or not _get_reader_instance():
-        return jsonify({"success": False, "message": "Chưa kết nối đến reader."})
+    # Snapshot the global once: the check and every later use see the same instance,
+    # even if a concurrent connect/disconnect rebinds `reader` meanwhile
+    reader_instance = reader
+    if not rfid_controller.is_connected or reader_instance is None:
+        return _json_response({"success": False, "message": "Chưa kết nối đến reader."})
     try:
-        reader_instance = _get_reader_instance()
         enabled_mask = reader_instance.query_enabled_ant_mask()
-        # Convert the 32-bit mask to a list of 1-based antenna IDs.
-        # Uses config.MAX_ANTENNAS for the loop limit.
-        enabled_ants = [i + 1 for i in range(config.MAX_ANTENNAS) if (enabled_mask >> i) & 1]
+        # Convert the 32-bit mask to a list of 1-based antenna IDs, one step per enabled antenna.
+        # Bits above config.MAX_ANTENNAS (`_MAX_ANTS`) are ignored.
+        enabled_ants = NationReader.antenna_ids_from_mask(enabled_mask, _MAX_ANTS)
         logger.info(f"Enabled antennas: {enabled_ants} (Mask: 0x{enabled_mask:08X}).")
-        return jsonify({"success": True, "antennas": enabled_ants})
+        return _json_response({"success": True, "antennas": enabled_ants})
     except Exception as e:
         logger.error(f"Error in API Get Enabled Antennas: {e}")
-        return jsonify({"success": False, "message": f"Lỗi: {str(e)}"})
+        return _json_response({"success": False, "message": f"Lỗi: {str(e)}"})
 
 @app.route('/api/disable_antennas', methods=['POST'])
 def api_disable_antennas() -> Dict:
@@ -883,10 +1383,10 @@ def api_disable_antennas() -> Dict:
     logger.info(f"API Disable Antennas request for: {antennas_to_disable}. Save on power down: {save_on_power_down}.")
     
     if not isinstance(antennas_to_disable, list):
-        return jsonify({"success": False, "message": "Danh sách antennas không hợp lệ. Vui lòng cung cấp một mảng số nguyên."})
+        return _json_response({"success": False, "message": "Danh sách antennas không hợp lệ. Vui lòng cung cấp một mảng số nguyên."})
 
     result = rfid_controller.disable_antennas(antennas_to_disable, save_on_power_down)
-    return jsonify(result)
+    return _json_response(result)
 
 @app.route('/api/get_antenna_power', methods=['GET'])
 def api_get_antenna_power() -> Dict:
@@ -895,36 +1395,19 @@ def api_get_antenna_power() -> Dict:
     """
     logger.info("API Get Antenna Power request received.")
     result = rfid_controller.get_antenna_power()
-    return jsonify(result)
+    return _json_response(result)
 
 @app.route('/api/config', methods=['GET'])
-def api_get_config() -> Dict:
+def api_get_config() -> Response:
     """
     API endpoint to retrieve the application's configuration settings.
+    Returns the body serialized at startup (`_CONFIG_JSON`); clients sending its ETag in
+    `If-None-Match` get an empty 304 response.
     """
-    logger.info("API Get Config request received.")
-    try:
-        # Return a subset of configuration data relevant for the frontend
-        config_data = {
-            "default_serial_port": config.DEFAULT_SERIAL_PORT, # Corrected from DEFAULT_PORT
-            "default_baudrate": config.DEFAULT_BAUDRATE,
-            "max_power": config.POWER_MAX_DBM, # Consistent naming
-            "min_power": config.POWER_MIN_DBM, # Consistent naming
-            "max_antennas": config.MAX_ANTENNAS,
-            "profiles": config.PROFILE_CONFIGS,
-            "max_tags_display": config.MAX_TAGS_DISPLAY,
-            "min_session": config.SESSION_MIN,
-            "max_session": config.SESSION_MAX,
-            "min_q_value": config.Q_VALUE_MIN,
-            "max_q_value": config.Q_VALUE_MAX,
-            "min_scan_time_seconds": config.SCAN_TIME_MIN_SECONDS,
-            "max_scan_time_seconds": config.SCAN_TIME_MAX_SECONDS,
-            "default_scan_time_seconds": config.DEFAULT_INVENTORY_SCAN_TIME_SECONDS,
-        }
-        return jsonify({"success": True, "data": config_data})
-    except Exception as e:
-        logger.error(f"Error in API Get Config: {e}")
-        return jsonify({"success": False, "message": f"Lỗi: {str(e)}"})
+    logger.debug("API Get Config request received.")
+    if request.headers.get('If-None-Match') == _CONFIG_ETAG:
+        return Response(status=304, headers={'ETag': _CONFIG_ETAG})
+    return Response(_CONFIG_JSON, mimetype='application/json', headers={'ETag': _CONFIG_ETAG})
 
 @app.route('/api/configure_baseband', methods=['POST'])
 def api_configure_baseband() -> Dict:
@@ -932,14 +1415,13 @@ def api_configure_baseband() -> Dict:
     API endpoint to configure the reader's baseband parameters.
     Expects JSON body with speed, q_value, session, and inventory_flag.
     """
-    data = request.get_json()
-    speed = int(data.get('speed', 0))
-    q_value = int(data.get('q_value', config.DEFAULT_Q_VALUE)) # Use config default
-    session = int(data.get('session', config.DEFAULT_SESSION)) # Use config default
-    inventory_flag = int(data.get('inventory_flag', 0)) # Default 0 (single)
+    values, error = _parse_int_fields(request.get_json(silent=True), _BASEBAND_FIELDS)
+    if error:
+        return _json_response({"success": False, "message": error})
+    speed, q_value, session, inventory_flag = values
     logger.info(f"API Configure Baseband request: Speed={speed}, Q={q_value}, Session={session}, Flag={inventory_flag}.")
     result = rfid_controller.configure_baseband(speed, q_value, session, inventory_flag)
-    return jsonify(result)
+    return _json_response(result)
 
 @app.route('/api/query_baseband_profile', methods=['GET'])
 def api_query_baseband_profile() -> Dict:
@@ -948,24 +1430,23 @@ def api_query_baseband_profile() -> Dict:
     """
     logger.info("API Query Baseband Profile request received.")
     result = rfid_controller.query_baseband_profile()
-    return jsonify(result)
+    return _json_response(result)
 
 
 @socketio.on('connect')
 def handle_connect() -> None:
     """Handles new WebSocket client connections."""
-    logger.info(f"🔌 WebSocket client connected: {request.sid}.")
+    logger.info("🔌 WebSocket client connected: %s.", request.sid)
     # Emit a status message back to the newly connected client
     emit('status', {'message': 'Connected to server'})
-    # Add the client's session ID to the set of connected clients
-    connected_clients.add(request.sid)
+    # Subscribe the client to the live tag stream
+    join_room(TAGS_ROOM)
 
 @socketio.on('disconnect')
 def handle_disconnect() -> None:
     """Handles WebSocket client disconnections."""
-    logger.info(f"🔌 WebSocket client disconnected: {request.sid}.")
-    # Remove the client's session ID from the set
-    connected_clients.remove(request.sid)
+    logger.info("🔌 WebSocket client disconnected: %s.", request.sid)
+    # Socket.IO removes the client from its rooms (including TAGS_ROOM) automatically
 
 @socketio.on('message')
 def handle_message(message: str) -> None:
@@ -973,51 +1454,59 @@ def handle_message(message: str) -> None:
     Handles generic messages received from a WebSocket client.
     `message` is the data sent by the client.
     """
-    logger.info(f"📨 Received WebSocket message from {request.sid}: {message}.")
+    # Clients may send messages at any rate: log lazily and only at DEBUG
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("📨 Received WebSocket message from %s: %s.", request.sid, message)
+
+@socketio.on_error_default
+def handle_socketio_error(e: Exception) -> None:
+    """
+    Single error sink for Socket.IO: errors raised by event handlers and by the tag flusher's
+    emits are counted in `inventory_stats["emit_errors"]`. Only the first error of a session is
+    logged at WARNING, so a client dropping mid-stream cannot flood the log.
+    """
+    inventory_stats["emit_errors"] += 1
+    if inventory_stats["emit_errors"] == 1:
+        logger.warning(f"❌ Socket.IO error (further errors are only counted): {e}")
+    else:
+        logger.debug("Socket.IO error: %s", e)
 
 @app.route('/api/tags_inventory', methods=['POST'])
 def api_tags_inventory() -> Dict:
     """
     API endpoint to start a custom "tags inventory" mode with configurable baseband parameters.
     This mode includes a `scan_time` parameter which defines the duration of the inventory run.
+    With `"dedup": true`, each EPC is stored and emitted only on its first read of the run;
+    repeated reads still count towards `total_count`.
     """
-    global inventory_thread, stop_inventory_flag, detected_tags, inventory_stats
-
-    if not rfid_controller.is_connected or not _get_reader_instance():
-        return jsonify({"success": False, "message": "Chưa kết nối đến reader."})
+    global inventory_thread, stop_inventory_flag
 
-    # If an inventory is already running, attempt to stop it before starting a new one
-    if inventory_thread and inventory_thread.is_alive():
-        logger.info("An existing inventory is currently running. Stopping it before initiating a new one.")
-        if not rfid_controller.stop_inventory().get("success"): # Use controller's stop method
-            logger.warning("Failed to cleanly stop the previous inventory before starting a new one.")
-        time.sleep(0.5) # Give the reader some time to stabilize after stopping
+    reader_instance = reader
+    if not rfid_controller.is_connected or reader_instance is None:
+        return _json_response({"success": False, "message": "Chưa kết nối đến reader."})
 
     try:
+        # Parse and validate parameters from the incoming JSON request against configured ranges,
+        # before touching a running inventory: a bad request must not stop the current scan or wipe its tags.
+        # inventory_flag determines the inventory mode (e.g., single, continuous, fast);
+        # scan_time is the duration for this specific inventory run in seconds.
+        data = request.get_json(silent=True) or {}
+        values, error = _parse_int_fields(data, _TAGS_INVENTORY_FIELDS)
+        if error:
+            return _json_response({"success": False, "message": error})
+        q_value, session, inventory_flag, scan_time_seconds = values
+        dedup = _parse_bool(data.get("dedup", False))
+
+        # If an inventory is already running, attempt to stop it before starting a new one
+        if rfid_controller.inventory_running():
+            logger.info("An existing inventory is currently running. Stopping it before initiating a new one.")
+            if not rfid_controller.stop_inventory().get("success"): # Use controller's stop method
+                logger.warning("Failed to cleanly stop the previous inventory before starting a new one.")
+            time.sleep(0.5) # Give the reader some time to stabilize after stopping
+
         # Reset state for the new inventory session
         stop_inventory_flag = False
-        detected_tags.clear()
-        inventory_stats = {"read_rate": 0, "total_count": 0}
-
-        # Parse parameters from the incoming JSON request
-        data = request.get_json()
-        q_value = int(data.get("q_value", config.DEFAULT_Q_VALUE)) # Use config default
-        session = int(data.get("session", config.DEFAULT_SESSION)) # Use config default
-        # inventory_flag determines the inventory mode (e.g., single, continuous, fast)
-        inventory_flag = int(data.get("inventory_flag", 0)) 
-        # scan_time is the duration for this specific inventory run in seconds
-        scan_time_seconds = int(data.get("scan_time", config.DEFAULT_INVENTORY_SCAN_TIME_SECONDS)) 
-
-        # Validate input parameters against configured ranges
-        if not config.Q_VALUE_MIN <= q_value <= config.Q_VALUE_MAX:
-            return jsonify({"success": False, "message": f"Giá trị Q ({q_value}) phải từ {config.Q_VALUE_MIN} đến {config.Q_VALUE_MAX}."})
-        if not config.SESSION_MIN <= session <= config.SESSION_MAX:
-            return jsonify({"success": False, "message": f"Giá trị Session ({session}) phải từ {config.SESSION_MIN} đến {config.SESSION_MAX}."})
-        if not config.SCAN_TIME_MIN_SECONDS <= scan_time_seconds <= config.SCAN_TIME_MAX_SECONDS:
-            return jsonify({"success": False, "message": f"Thời gian quét ({scan_time_seconds}s) phải từ {config.SCAN_TIME_MIN_SECONDS}s đến {config.SCAN_TIME_MAX_SECONDS}s."})
-
-        # Get the current reader instance
-        reader_instance = _get_reader_instance() 
+        _reset_inventory_state()
 
         # Configure baseband parameters on the reader before starting inventory
         configure_result = rfid_controller.configure_baseband(
@@ -1027,27 +1516,43 @@ def api_tags_inventory() -> Dict:
             inventory_flag=inventory_flag
         )
         if not configure_result.get("success"): 
-            return jsonify({"success": False, "message": f"Không thể cấu hình baseband: {configure_result.get('message', 'Lỗi không xác định')}"})
+            return _json_response({"success": False, "message": f"Không thể cấu hình baseband: {configure_result.get('message', 'Lỗi không xác định')}"})
+
+        # "%H:%M:%S" timestamp shared by all tags read within the same ~250 ms, so `strftime`
+        # runs a few times per second instead of once per tag
+        timestamp_text = ""
+        timestamp_refresh_at = 0.0
+        # EPCs already seen in this run (only used with `dedup`); created per request, so every
+        # run starts empty. Exact set membership, so no unique tag is ever suppressed by mistake.
+        seen_epcs: set = set()
 
         def tag_callback_custom_inventory(tag: Dict) -> None:
             """
             Callback function specifically for new tag detections during custom inventory.
+            The EPC arrives already hex-encoded by `NationReader.parse_epc` and is passed through as is.
             """
-            tag_data = {
-                "epc": tag.get("epc"),
-                "rssi": tag.get("rssi"),
-                "antenna": tag.get("antenna_id"),
-                "timestamp": time.strftime("%H:%M:%S")
-            }
-            detected_tags.append(tag_data) # `maxlen` handles deque size automatically
+            nonlocal timestamp_text, timestamp_refresh_at
+            if dedup:
+                epc = tag["epc"]
+                if epc in seen_epcs:
+                    # Repeated read: count it, but skip the ring write and the emit
+                    inventory_stats["total_count"] = next(_tag_counter)
+                    return
+                seen_epcs.add(epc)
+
+            now = time.monotonic()
+            if now >= timestamp_refresh_at:
+                timestamp_text = time.strftime("%H:%M:%S")
+                timestamp_refresh_at = now + 0.25
+
+            tag_data = TagEvent(tag["epc"], tag["rssi"], tag["antenna_id"], timestamp_text)
+            detected_tags.append(tag_data.epc, tag_data.rssi, tag_data.antenna) # Oldest tag is overwritten once full
             
-            # Update total tag count
-            inventory_stats["total_count"] += 1 
+            # Update total tag count (race-free: the counter hands out each value once)
+            inventory_stats["total_count"] = next(_tag_counter)
 
-            try:
-                socketio.emit("tag_detected", tag_data)
-            except Exception as e:
-                logger.error(f"❌ WebSocket emit failed in custom tags inventory callback: {e}")
+            # Hand off to the flusher task (see `_tag_flusher`)
+            _queue_tag(tag_data)
 
         def inventory_worker_custom() -> None:
             """
@@ -1059,39 +1564,46 @@ def api_tags_inventory() -> Dict:
                 if reader_instance: # Ensure the reader instance is still valid
                     reader_instance.uart.flush_input() # Clear buffer before starting
                     
-                    # Build antenna mask for the inventory; assuming default antenna 1 if not specified.
-                    # If this API should allow antenna selection, pass it from 'data'.
-                    default_antenna_mask = reader_instance.build_antenna_mask([config.DEFAULT_ANTENNA_ID]) 
-
+                    # Inventory on the default antenna; if this API should allow antenna selection, pass it from 'data'.
+                    # No reception thread: this worker drains the serial port itself (see `_drain_inventory`).
                     if reader_instance.start_inventory_with_mode(
-                        antenna_mask=default_antenna_mask,
-                        callback=tag_callback_custom_inventory
+                        antenna_mask=[config.DEFAULT_ANTENNA_ID],
+                        callback=tag_callback_custom_inventory,
+                        spawn_thread=False
                     ):
                         logger.info(f"▶️ Inventory started for {scan_time_seconds} seconds (custom tags inventory mode).")
-                        time.sleep(scan_time_seconds) # Sleep for the specified duration
+                        _drain_inventory(reader_instance, time.monotonic() + scan_time_seconds)
                         logger.info("Custom tags inventory duration ended, attempting to stop reader.")
-                        reader_instance.stop_inventory() # Stop the reader after the duration
                     else:
                         logger.error("Failed to start inventory in custom tags inventory mode.")
 
             except Exception as e:
                 logger.error(f"Error in custom tags inventory worker: {e}")
             finally:
+                # Stop the reader after the duration, on a stop request, or if draining failed
+                if reader_instance and reader_instance.is_inventory_running():
+                    try:
+                        reader_instance.stop_inventory()
+                    except Exception as e:
+                        logger.error(f"Error stopping reader after custom tags inventory: {e}")
                 logger.info("Custom tags inventory worker finished.")
+                rfid_controller._inv_stopped.set()
                 
-        # Create and start the new inventory thread as a daemon
-        inventory_thread = threading.Thread(target=inventory_worker_custom, daemon=True)
-        inventory_thread.start()
+        _ensure_tag_flusher()
+        rfid_controller._inv_stopped.clear()
 
-        logger.info(f"Custom tags inventory started (Q={q_value}, Session={session}, Flag={inventory_flag}, Scan={scan_time_seconds}s).")
-        return jsonify({
+        # Run the worker as a Socket.IO background task so it is scheduled by the server's async mode
+        inventory_thread = socketio.start_background_task(inventory_worker_custom)
+
+        logger.info(f"Custom tags inventory started (Q={q_value}, Session={session}, Flag={inventory_flag}, Scan={scan_time_seconds}s, Dedup={dedup}).")
+        return _json_response({
             "success": True,
             "message": f"Tags inventory đã bắt đầu (Q={q_value}, Session={session}, Flag={inventory_flag}, Scan={scan_time_seconds}s)"
         })
 
     except Exception as e:
         logger.error(f"Error starting custom tags inventory: {e}")
-        return jsonify({"success": False, "message": f"Lỗi: {str(e)}"})
+        return _json_response({"success": False, "message": f"Lỗi: {str(e)}"})
     
 
 @app.route('/api/write_epc_tag_auto', methods=['POST'])
@@ -1109,14 +1621,18 @@ def api_write_epc_tag_auto() -> Dict:
     timeout = data.get('timeout', 1.0) # Default timeout for write response
 
     if not epc_to_write:
-        return jsonify({"success": False, "message": "EPC mới không được để trống."})
+        return _json_response({"success": False, "message": "EPC mới không được để trống."})
+
+    # Reject malformed hex before any serial round-trip to the reader
+    if not _is_hex_text(epc_to_write) or (match_epc_hex and not _is_hex_text(match_epc_hex)):
+        return _json_response({"success": False, "message": "EPC chỉ được chứa ký tự hex (0-9, A-F)."})
     
-    if not rfid_controller.is_connected or not _get_reader_instance():
-        return jsonify({"success": False, "message": "Chưa kết nối đến reader."})
+    reader_instance = reader
+    if not rfid_controller.is_connected or reader_instance is None:
+        return _json_response({"success": False, "message": "Chưa kết nối đến reader."})
     
     logger.info(f"API Write EPC Auto request: New EPC='{epc_to_write}', Match EPC='{match_epc_hex}', Ant ID={antenna_id}.")
     try:
-        reader_instance = _get_reader_instance()
         result = reader_instance.write_epc_tag_auto(
             new_epc_hex=epc_to_write,
             match_epc_hex=match_epc_hex,
@@ -1125,10 +1641,10 @@ def api_write_epc_tag_auto() -> Dict:
             timeout=timeout
         )
         logger.info(f"Write EPC Auto command sent, result success: {result.get('success')}. Message: {result.get('result_msg')}")
-        return jsonify(result)
+        return _json_response(result)
     except Exception as e:
         logger.error(f"Error in API Write EPC Auto: {e}")
-        return jsonify({"success": False, "message": f"Lỗi: {str(e)}"})
+        return _json_response({"success": False, "message": f"Lỗi: {str(e)}"})
     
 @app.route('/api/check_write_epc', methods=['POST'])
 def api_check_write_epc() -> Dict:
@@ -1143,14 +1659,14 @@ def api_check_write_epc() -> Dict:
     # antenna_id = data.get('antenna_id', config.DEFAULT_ANTENNA_ID) 
 
     if not epc_to_check:
-        return jsonify({"success": False, "message": "EPC không được để trống để kiểm tra."})
+        return _json_response({"success": False, "message": "EPC không được để trống để kiểm tra."})
     
-    if not rfid_controller.is_connected or not _get_reader_instance():
-        return jsonify({"success": False, "message": "Chưa kết nối đến reader."})
+    reader_instance = reader
+    if not rfid_controller.is_connected or reader_instance is None:
+        return _json_response({"success": False, "message": "Chưa kết nối đến reader."})
     
     logger.info(f"API Check Write EPC request for: '{epc_to_check}'.")
     try:
-        reader_instance = _get_reader_instance()
         # The `check_write_epc` method in `nation.py` (translated) starts its own temporary
         # inventory, waits for a tag, and returns True if successful.
         check_result = reader_instance.check_write_epc(
@@ -1161,13 +1677,13 @@ def api_check_write_epc() -> Dict:
         
         if check_result:
             logger.info(f"Check write EPC for '{epc_to_check}' indicates success. Tag matched or write function appears supported.")
-            return jsonify({"success": True, "message": "Thẻ đã được ghi thành công (hoặc khả năng ghi được hỗ trợ)."})
+            return _json_response({"success": True, "message": "Thẻ đã được ghi thành công (hoặc khả năng ghi được hỗ trợ)."})
         else:
             logger.warning(f"Check write EPC for '{epc_to_check}' indicates failure. Tag not matched or write function not supported.")
-            return jsonify({"success": False, "message": "Thẻ không khớp hoặc chức năng ghi không được hỗ trợ."})
+            return _json_response({"success": False, "message": "Thẻ không khớp hoặc chức năng ghi không được hỗ trợ."})
     except Exception as e:
         logger.error(f"Error in API Check Write EPC for '{epc_to_check}': {e}")
-        return jsonify({"success": False, "message": f"Lỗi: {str(e)}"})
+        return _json_response({"success": False, "message": f"Lỗi: {str(e)}"})
     
 # ---
 # ## Main Application Entry Point
@@ -1175,7 +1691,22 @@ def api_check_write_epc() -> Dict:
 # This block starts the Flask-SocketIO server.
 
 # ```python
+def _pin_to_cpu(cpu: Optional[int]) -> None:
+    """
+    Pins the whole process to `cpu` (see `config.WORKER_CPU`). The inventory worker is a green task
+    sharing the process's single OS thread, so the process is the unit that can be pinned.
+    Best effort: unsupported platforms and invalid CPU indexes only log a warning.
+    """
+    if cpu is None:
+        return
+    try:
+        os.sched_setaffinity(0, {cpu})
+        logger.info(f"📌 Process pinned to CPU {cpu}.")
+    except (AttributeError, OSError, ValueError) as e:
+        logger.warning(f"⚠️ Could not pin process to CPU {cpu}: {e}")
+
 if __name__ == '__main__':
+    _pin_to_cpu(config.WORKER_CPU)
     # Log the server start details from the config
     logger.info(f"Starting RFID Web Control Panel on http://{config.HOST}:{config.PORT}...")
     # Run the Flask-SocketIO application.
@@ -2,147 +2,228 @@
 Cấu hình cho ứng dụng RFID Reader Web Control Panel
 """
 
+import logging
 import os
+from collections import deque
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Any, Callable, Dict, NamedTuple, Optional, Tuple, Union
+
+class Profile(NamedTuple):
+    """Baseband parameters of one predefined reader profile (see `Config.PROFILES`)."""
+    name: str
+    speed: int
+    q_value: int
+    session: int
+    inventory_flag: int
+
+# Snapshot of the process environment. Settings read it with plain dict lookups instead of
+# going through `os.environ` (str encode/decode per access); refreshed by `get_config`.
+_ENV: Dict[str, str] = dict(os.environ)
+
+def _env_int(key: str, default: Optional[int]) -> Optional[int]:
+    """Integer setting from `_ENV`; an unset (or empty) variable returns `default` without parsing."""
+    value = _ENV.get(key)
+    return int(value) if value else default
+
+def _env_origins(key: str) -> Union[str, Tuple[str, ...]]:
+    """
+    Allowed CORS origins from a comma-separated variable in `_ENV`. Returns the string '*' when unset
+    or '*' (python-engineio only treats the plain string as a wildcard), otherwise a tuple of
+    exact origins, which engineio matches with plain membership tests.
+    """
+    value = (_ENV.get(key) or '*').strip()
+    if value == '*':
+        return '*'
+    return tuple(origin.strip() for origin in value.split(',') if origin.strip())
+
+def _env_flag(key: str) -> bool:
+    """Boolean setting from `_ENV`: '1', 'true' or 'yes' (any case) enable it; anything else, or unset, does not."""
+    return _ENV.get(key, '').lower() in ('1', 'true', 'yes')
 
+def _env_upper(key: str, default: str) -> str:
+    """Upper-cased setting from `_ENV`; `default` is expected to be upper-case already."""
+    value = _ENV.get(key)
+    return value.upper() if value else default
+
+@dataclass(frozen=True, slots=True)
 class Config:
     """
-    Base configuration for the RFID Reader Web Control Panel.
-    Defines common settings inherited by all environments.
+    Configuration for the RFID Reader Web Control Panel.
+    Defines the settings shared by all environments; `build_config` applies the
+    per-environment overrides (`ENVIRONMENT_OVERRIDES`) as constructor arguments.
+    A frozen, slotted dataclass: settings are read as slot attributes (no per-instance `__dict__`)
+    and cannot be reassigned at runtime. Environment-derived settings use `default_factory`,
+    so the environment is read when the instance is created (once, see `get_config`).
     """
     # --- Flask Application Settings ---
+    # DEBUG / TESTING: Flask's debug and testing flags; set per environment (see ENVIRONMENT_OVERRIDES).
+    DEBUG: bool = False
+    TESTING: bool = False
     # SECRET_KEY: Crucial for session management and security.
     # It's highly recommended to set a strong, unique value via environment variable in production.
-    SECRET_KEY = os.environ.get('SECRET_KEY', 'a_strong_default_secret_key_for_dev')
+    SECRET_KEY: str = field(default_factory=lambda: _ENV.get('SECRET_KEY', 'a_strong_default_secret_key_for_dev'))
 
     # --- Server Host and Port ---
     # HOST: The IP address the Flask server listens on. '0.0.0.0' makes it accessible externally.
     # PORT: The port number the Flask server runs on.
-    HOST = os.environ.get('HOST', '0.0.0.0')
-    PORT = int(os.environ.get('PORT', 3000))
+    HOST: str = field(default_factory=lambda: _ENV.get('HOST', '0.0.0.0'))
+    PORT: int = field(default_factory=lambda: _env_int('PORT', 3000))
 
     # --- Serial Communication Settings ---
     # DEFAULT_SERIAL_PORT: The default serial port path for the RFID reader (e.g., /dev/ttyUSB0 on Linux, COM3 on Windows).
     # DEFAULT_BAUDRATE: The default baud rate for serial communication with the reader.
-    DEFAULT_SERIAL_PORT = os.environ.get('DEFAULT_SERIAL_PORT', '/dev/ttyUSB0')
-    DEFAULT_BAUDRATE = int(os.environ.get('DEFAULT_BAUDRATE', 115200))
+    DEFAULT_SERIAL_PORT: str = field(default_factory=lambda: _ENV.get('DEFAULT_SERIAL_PORT', '/dev/ttyUSB0'))
+    DEFAULT_BAUDRATE: int = field(default_factory=lambda: _env_int('DEFAULT_BAUDRATE', 115200))
 
     # --- RFID Reader Protocol Defaults ---
     # These values are often used as fallback or initial settings for reader commands
     # when specific parameters are not provided by the client (e.g., UI).
-    DEFAULT_READER_ADDRESS = 0x00 # Standard address for many RS485/UART readers
-    DEFAULT_Q_VALUE = 4           # Default Q value for inventory rounds (0-15)
-    DEFAULT_SESSION = 0           # Default Session (S0, S1, S2, S3) for inventory (0-3)
-    DEFAULT_ANTENNA_ID = 1        # Default antenna port to use (1-based)
-    DEFAULT_INVENTORY_SCAN_TIME_SECONDS = 10 # Default duration for a continuous inventory scan
+    DEFAULT_READER_ADDRESS: int = 0x00 # Standard address for many RS485/UART readers
+    DEFAULT_Q_VALUE: int = 4           # Default Q value for inventory rounds (0-15)
+    DEFAULT_SESSION: int = 0           # Default Session (S0, S1, S2, S3) for inventory (0-3)
+    DEFAULT_ANTENNA_ID: int = 1        # Default antenna port to use (1-based)
+    DEFAULT_INVENTORY_SCAN_TIME_SECONDS: int = 10 # Default duration for a continuous inventory scan
 
     # --- WebSocket Configuration (for Flask-SocketIO) ---
-    # SOCKETIO_ASYNC_MODE: Specifies the asynchronous mode. 'threading' is common for simple Flask apps.
+    # SOCKETIO_ASYNC_MODE: Specifies the asynchronous mode (env SOCKETIO_ASYNC_MODE, default 'eventlet').
+    # 'eventlet' or 'gevent' serve Socket.IO over a real WebSocket transport with greenlets (one OS
+    # thread for all clients); 'threading' falls back to HTTP long-polling, which adds a polling delay
+    # to every tag event. app.py monkey-patches the standard library for eventlet/gevent at import
+    # time and falls back to 'threading' if the requested library is not installed.
     # SOCKETIO_CORS_ALLOWED_ORIGINS: Defines which origins (frontends) are allowed to connect via WebSocket.
-    # Use '*' for development; specify concrete origins (e.g., "http://localhost:3001") for production.
-    SOCKETIO_ASYNC_MODE = 'threading' 
-    SOCKETIO_CORS_ALLOWED_ORIGINS = "*"
+    # Read from env SOCKETIO_CORS_ORIGINS as a comma-separated list (e.g. "http://localhost:5173,https://rfid.example").
+    # Unset means '*', which is fine for development; production refuses to start with '*'.
+    SOCKETIO_ASYNC_MODE: str = field(default_factory=lambda: _ENV.get('SOCKETIO_ASYNC_MODE', 'eventlet'))
+    SOCKETIO_CORS_ALLOWED_ORIGINS: Union[str, Tuple[str, ...]] = field(default_factory=lambda: _env_origins('SOCKETIO_CORS_ORIGINS'))
+
+    # --- Request Profiling ---
+    # PROFILE_REQUESTS: When env FLASK_PROFILE is 1/true/yes, app.py wraps the WSGI app in Werkzeug's
+    # ProfilerMiddleware, printing per-request cProfile stats (top 30 by cumulative time) to stderr.
+    # Named to avoid confusion with the reader PROFILES below. Leave off outside profiling sessions.
+    PROFILE_REQUESTS: bool = field(default_factory=lambda: _env_flag('FLASK_PROFILE'))
+
+    # --- CPU Affinity ---
+    # WORKER_CPU: Optional CPU index to pin the server process to (Linux only). With eventlet, the
+    # inventory worker, the UART drain and the tag flusher all run as green tasks in one OS thread,
+    # so pinning the process keeps the frame parser's state on one core. Unset = no pinning.
+    WORKER_CPU: Optional[int] = field(default_factory=lambda: _env_int('WORKER_CPU', None))
 
     # --- Logging Settings ---
     # LOG_LEVEL: Minimum logging level to capture (e.g., 'INFO', 'DEBUG', 'WARNING', 'ERROR').
     # LOG_FORMAT: Format string for log messages.
-    LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO').upper()
-    LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    # LOG_FORMATTER: `logging.Formatter` built once from LOG_FORMAT; attach it to handlers directly.
+    LOG_LEVEL: str = field(default_factory=lambda: _env_upper('LOG_LEVEL', 'INFO'))
+    LOG_FORMAT: str = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    LOG_FORMATTER: logging.Formatter = field(init=False, repr=False, compare=False)
 
     # --- Frontend/UI Behavior Settings ---
-    # MAX_TAGS_DISPLAY: Maximum number of tags to keep in the UI display buffer (uses deque).
+    # MAX_TAGS_DISPLAY: Maximum number of tags to keep in the UI display buffer (capacity of the tag ring).
     # AUTO_REFRESH_INTERVAL_MS: Interval (in milliseconds) for UI elements to auto-refresh (if applicable).
-    MAX_TAGS_DISPLAY = 100
-    AUTO_REFRESH_INTERVAL_MS = 5000
+    MAX_TAGS_DISPLAY: int = 100
+    AUTO_REFRESH_INTERVAL_MS: int = 5000
 
     # --- RFID Hardware Capabilities & Constraints ---
     # These define the valid operating ranges and limits for the RFID reader,
     # used for input validation in the application logic.
-    MAX_ANTENNAS = 4
-    DEFAULT_ANTENNA_POWER_DBM = 12 # Default transmit power in dBm
+    MAX_ANTENNAS: int = 4
+    DEFAULT_ANTENNA_POWER_DBM: int = 12 # Default transmit power in dBm
 
     # Power Configuration Limits (dBm)
-    POWER_MIN_DBM = 0
-    POWER_MAX_DBM = 30 
+    POWER_MIN_DBM: int = 0
+    POWER_MAX_DBM: int = 30 
     
     # Session Configuration Limits
-    SESSION_MIN = 0
-    SESSION_MAX = 3
+    SESSION_MIN: int = 0
+    SESSION_MAX: int = 3
     
     # Q-Value Configuration Limits
-    Q_VALUE_MIN = 0
-    Q_VALUE_MAX = 15
+    Q_VALUE_MIN: int = 0
+    Q_VALUE_MAX: int = 15
     
     # Scan Time Configuration Limits (seconds)
-    SCAN_TIME_MIN_SECONDS = 1
-    SCAN_TIME_MAX_SECONDS = 255
+    SCAN_TIME_MIN_SECONDS: int = 1
+    SCAN_TIME_MAX_SECONDS: int = 255
+
+    # Inclusive MIN..MAX limits above as `range` objects, derived in `__post_init__`:
+    # validate with `x in config.Q_VALUE_RANGE` (a C-level check for ints). Integer-only
+    # settings only: power is compared against POWER_MIN_DBM/POWER_MAX_DBM since it may be a float.
+    SESSION_RANGE: range = field(init=False, repr=False, compare=False)
+    Q_VALUE_RANGE: range = field(init=False, repr=False, compare=False)
+    SCAN_TIME_RANGE: range = field(init=False, repr=False, compare=False)
 
     # --- Example Profile Configurations ---
     # Define sets of baseband parameters for different operating scenarios (e.g., speed vs. density).
     # These can be customized to match your specific reader's capabilities or application needs.
-    PROFILE_CONFIGS = {
-        1: {"name": "Performance", "speed": 0, "q_value": 7, "session": 0, "inventory_flag": 1},
-        2: {"name": "Density", "speed": 1, "q_value": 4, "session": 1, "inventory_flag": 0},
-        3: {"name": "Balanced", "speed": 2, "q_value": 5, "session": 2, "inventory_flag": 2},
-    }
-
-class DevelopmentConfig(Config):
-    """
-    Configuration specifically for the development environment.
-    Enables debugging, sets a more verbose log level, and can use a different port.
-    """
-    DEBUG = True
-    LOG_LEVEL = 'DEBUG'
-    # Optional: Override HOST/PORT here if you want a different address
-    # or port specifically for development, e.g., '127.0.0.1' for local access only.
-    # PORT = 5000 # Example: run development on a different port than default 3000
-
-
-class ProductionConfig(Config):
-    """
-    Configuration specifically for the production environment.
-    Disables debugging, sets a less verbose log level (INFO), and ensures
-    appropriate host/port defaults for deployment.
-    """
-    DEBUG = False
-    LOG_LEVEL = 'INFO' # Changed from 'WARNING' to 'INFO' for better operational visibility.
-                       # 'WARNING' can miss important system health details.
-    
-    # In production, it's common to listen on all interfaces but use environment
-    # variables for the port, defaulting to a standard HTTP port like 5000 or 80.
-    HOST = os.environ.get('HOST', '0.0.0.0')
-    PORT = int(os.environ.get('PORT', 5000))
-
+    # Indexed by profile number (`PROFILES[n].q_value`); index 0 is unused, profiles start at 1.
+    PROFILES: Tuple[Optional[Profile], ...] = (
+        None,
+        Profile("Performance", speed=0, q_value=7, session=0, inventory_flag=1),
+        Profile("Density", speed=1, q_value=4, session=1, inventory_flag=0),
+        Profile("Balanced", speed=2, q_value=5, session=2, inventory_flag=2),
+    )
+
+    def __post_init__(self) -> None:
+        # Derived from LOG_FORMAT and the MIN/MAX limits (which may be passed in); frozen, so set via object
+        object.__setattr__(self, 'LOG_FORMATTER', logging.Formatter(self.LOG_FORMAT))
+        object.__setattr__(self, 'SESSION_RANGE', range(self.SESSION_MIN, self.SESSION_MAX + 1))
+        object.__setattr__(self, 'Q_VALUE_RANGE', range(self.Q_VALUE_MIN, self.Q_VALUE_MAX + 1))
+        object.__setattr__(self, 'SCAN_TIME_RANGE', range(self.SCAN_TIME_MIN_SECONDS, self.SCAN_TIME_MAX_SECONDS + 1))
+
+    def make_tag_buffer(self, factory: Optional[Callable[[int], Any]] = None) -> Any:
+        """
+        Returns a new tag display buffer holding at most `MAX_TAGS_DISPLAY` tags.
+        By default a `deque(maxlen=MAX_TAGS_DISPLAY)`; pass `factory` (called with the capacity)
+        for another fixed-capacity buffer, e.g. the app's `TagRing`.
+        """
+        if factory is None:
+            return deque(maxlen=self.MAX_TAGS_DISPLAY)
+        return factory(self.MAX_TAGS_DISPLAY)
+
+# --- Environment Overrides ---
+# Each environment (typically selected by FLASK_ENV) is the single `Config` dataclass built with
+# the keyword overrides below; there are no per-environment subclasses. Values are produced at
+# build time (callables), so environment-derived overrides read the current `_ENV` snapshot.
+ENVIRONMENT_OVERRIDES: Dict[str, Callable[[], Dict[str, Any]]] = {
+    # Development: enables debugging and sets a more verbose log level.
+    # Optional: add HOST/PORT here if you want a different address or port specifically for
+    # development, e.g. "HOST": '127.0.0.1' for local access only.
+    'development': lambda: {"DEBUG": True, "LOG_LEVEL": 'DEBUG'},
+    # Production: disables debugging and uses INFO rather than WARNING, which can miss important
+    # system health details. Listens on all interfaces (HOST default) and defaults to port 5000.
+    'production': lambda: {"DEBUG": False, "LOG_LEVEL": 'INFO', "PORT": _env_int('PORT', 5000)},
+    # Testing: Flask's `TESTING` flag, debugging and verbose logging, and a separate port
+    # to avoid conflicts with development/production.
+    'testing': lambda: {"TESTING": True, "DEBUG": True, "LOG_LEVEL": 'DEBUG', "PORT": _env_int('TEST_PORT', 5001)},
+}
+# Environment used when FLASK_ENV is not set or does not name a known environment
+DEFAULT_ENVIRONMENT = 'development'
 
-class TestingConfig(Config):
+def build_config(env: str) -> Config:
     """
-    Configuration specifically for the testing environment.
-    Enables debugging and sets a verbose log level suitable for automated tests.
-    Uses Flask's built-in `TESTING` flag.
+    Builds the configuration for the environment named `env` ('development', 'production'
+    or 'testing'), falling back to `DEFAULT_ENVIRONMENT` for unknown names.
+    Raises `ValueError` for production without an explicit SOCKETIO_CORS_ORIGINS list.
     """
-    TESTING = True # Activates Flask's testing mode
-    DEBUG = True   # Enables debugging during tests
-    LOG_LEVEL = 'DEBUG'
-    # Use ephemeral ports or specific testing ports to avoid conflicts with development/production.
-    PORT = int(os.environ.get('TEST_PORT', 5001)) # Often uses a different port for tests
-
-
-# --- Configuration Mapping ---
-# This dictionary maps environment names (typically from FLASK_ENV) to their
-# corresponding configuration class instances.
-config_map = {
-    'development': DevelopmentConfig,
-    'production': ProductionConfig,
-    'testing': TestingConfig,
-    'default': DevelopmentConfig # 'default' will use DevelopmentConfig if FLASK_ENV is not set
-}
+    overrides = ENVIRONMENT_OVERRIDES.get(env) or ENVIRONMENT_OVERRIDES[DEFAULT_ENVIRONMENT]
+    config = Config(**overrides())
+    if env == 'production' and config.SOCKETIO_CORS_ALLOWED_ORIGINS == '*':
+        raise ValueError("Production requires SOCKETIO_CORS_ORIGINS to list the allowed origins explicitly (no '*').")
+    return config
 
+@lru_cache(maxsize=1)
 def get_config() -> Config:
     """
-    Retrieves the configuration class instance based on the 'FLASK_ENV'
+    Retrieves the configuration instance based on the 'FLASK_ENV'
     environment variable. If 'FLASK_ENV' is not set or its value
-    does not match a defined configuration, it defaults to 'development'.
+    does not match a defined environment, it defaults to 'development'.
+    The environment is snapshotted (`_ENV`) and the instance created once per process; later calls
+    return the same object. Use `invalidate()` to force a re-read (e.g. in tests).
     """
-    config_name = os.environ.get('FLASK_ENV', 'default')
-    # Retrieve the configuration class from the map,
-    # and then instantiate it by calling it (e.g., DevelopmentConfig()).
-    return config_map.get(config_name, config_map['default'])()
\ No newline at end of file
+    # One pass over the real environment; every setting below reads the snapshot
+    _ENV.clear()
+    _ENV.update(os.environ)
+    return build_config(_ENV.get('FLASK_ENV', DEFAULT_ENVIRONMENT))
+
+# Drops the cached configuration so the next `get_config()` re-reads the environment
+invalidate = get_config.cache_clear
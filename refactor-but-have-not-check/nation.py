@@ -1,3 +1,4 @@
+import functools
 import serial
 import serial.tools.list_ports
 import time
@@ -20,6 +21,9 @@ PROTO_VER: int = 0x01
 RS485_FLAG: int = 0x00 # Indicates RS485 communication (0x00 means not RS485 for upper computer commands)
 READER_NOTIFY_FLAG: int = 0x00 # Set to 0 for upper computer commands (i.e., not a notification from reader)
 
+# Valid hexadecimal digits, used as the delete table of `bytes.translate` in `NationReader.is_hex_string`
+HEX_DIGITS: bytes = b"0123456789abcdefABCDEF"
+
 # --- UART Connection Class ---
 class UARTConnection:
     """
@@ -66,9 +70,11 @@ class UARTConnection:
                 parity=serial.PARITY_NONE,
                 stopbits=serial.STOPBITS_ONE,
                 timeout=self.timeout,
+                write_timeout=self.timeout, # Fail instead of blocking forever on a stuck port
                 xonxoff=False, # Disable software flow control
                 rtscts=False,  # Disable hardware flow control
-                dsrdtr=False   # Disable DSR/DTR flow control
+                dsrdtr=False,  # Disable DSR/DTR flow control
+                exclusive=True # POSIX: refuse to share the port with another process (Windows ports are always exclusive)
             )
             # Explicitly open the port if it was just created but not auto-opened
             if not self.ser.is_open:
@@ -258,6 +264,13 @@ class NationReader:
     # Class-level default timeout
     DEFAULT_TIMEOUT: float = 0.5
 
+    # Notification MIDs that end a read operation (see `all_read_end_mids`), as a set for
+    # O(1) membership tests in the inventory receive loop
+    READ_END_MIDS: frozenset = frozenset((0x01, 0x21, 0x31))
+
+    # Profile IDs accepted by the Select Baseband Profile command (see `select_profile`)
+    PROFILE_IDS: frozenset = frozenset((0, 1, 2))
+
     # Class-level defaults for port and baudrate (can be set dynamically)
     # These are commented out as they are often handled by a separate configuration system (e.g., config.py)
     # DEFAULT_PORT: Optional[str] = None
@@ -300,6 +313,13 @@ class NationReader:
         self._ext_ant_masks: Dict[int, int] = {i: 0 for i in range(1, 33)} # Main Ant 1–32
         self.antenna_mask: int = 0x00000001 # Current active antenna mask (default to Antenna 1)
 
+        # Inventory state (set up by `start_inventory_with_mode`)
+        self._inventory_running: bool = False
+        self._inventory_thread: Optional[threading.Thread] = None
+        self._on_tag: Optional[Callable[[Dict], None]] = None
+        self._on_inventory_end: Optional[Callable[[Optional[int]], None]] = None
+        # Unparsed bytes carried between `feed_bytes` calls (partial frames)
+        self._feed_buffer: bytes = b""
 
     def open(self) -> None:
         """
@@ -529,7 +549,21 @@ class NationReader:
         Returns:
             list[bytes]: A list of valid, complete frames found in the stream.
         """
+        return self.extract_frames_with_end(data)[0]
+
+    def extract_frames_with_end(self, data: bytes) -> Tuple[List[bytes], int]:
+        """
+        Same as `extract_valid_frames`, but also returns the offset just past the last valid frame
+        (0 if there is none), so callers can trim their buffer without searching for the frame bytes.
+
+        Args:
+            data (bytes): The raw byte stream to parse.
+
+        Returns:
+            tuple[list[bytes], int]: The valid frames and the end offset of the last one.
+        """
         frames: List[bytes] = []
+        end: int = 0
         i: int = 0
         
         while i < len(data):
@@ -570,6 +604,7 @@ class NationReader:
 
             if calculated_crc == received_crc:
                 frames.append(frame) # Add valid frame to the list
+                end = i + full_len
             else:
                 # Log CRC mismatch but continue searching for other frames
                 print(f"⚠️ CRC mismatch at index {i}: expected=0x{calculated_crc:04X}, got=0x{received_crc:04X}. Discarding frame.")
@@ -577,7 +612,7 @@ class NationReader:
             # Move index past the processed (valid or invalid) frame
             i += full_len
 
-        return frames
+        return frames, end
 
     def Connect_Reader_And_Initialize(self) -> bool:
         """
@@ -864,7 +899,8 @@ class NationReader:
         return True
 
 
-    def build_epc_read_payload(self, antenna_mask: int, continuous: bool = True) -> bytes:
+    @staticmethod
+    def build_epc_read_payload(antenna_mask: int, continuous: bool = True) -> bytes:
         """
         Builds the data payload for the 'Read EPC Tag' command (MID=0x10).
 
@@ -1016,8 +1052,8 @@ class NationReader:
             print("❌ Invalid argument: antenna_powers must be a dictionary of {int: int}.")
             return False
         
-        # Build payload parts for each antenna power setting
-        payload_parts: List[bytes] = []
+        # Interleaved [antenna ID (PID), power dBm (value)] byte pairs, one pair per antenna
+        pairs: bytearray = bytearray()
         for ant_id, power_dbm in antenna_powers.items():
             if not isinstance(ant_id, int) or not isinstance(power_dbm, int):
                 print(f"❌ Invalid types: antenna ID ({type(ant_id)}) and power ({type(power_dbm)}) must both be integers.")
@@ -1034,15 +1070,36 @@ class NationReader:
                 return False
             
             # Append PID (Antenna ID) and Value (Power dBm) bytes
-            payload_parts.append(ant_id.to_bytes(1, 'big')) 
-            payload_parts.append(power_dbm.to_bytes(1, 'big')) 
-        
+            pairs.append(ant_id)
+            pairs.append(power_dbm)
+
+        return self.configure_reader_power_pairs(pairs, persistence=persistence)
+
+    def configure_reader_power_pairs(self, pairs: bytes, persistence: Optional[bool] = None) -> bool:
+        """
+        Sends the CONFIGURE_READER_POWER command for pre-validated antenna power settings.
+        `configure_reader_power` validates its dict and delegates here; callers that already hold
+        the settings as a flat buffer can call this directly and skip the per-entry dict handling.
+
+        Args:
+            pairs (bytes-like): Interleaved `[antenna ID, power dBm]` bytes (e.g. `bytes`, `bytearray`,
+                                `array('B')` or a `memoryview` of one). Values are sent as-is and must
+                                already be in range (antenna 1-64, power 0-33 dBm).
+            persistence (Optional[bool]): If True, settings are saved after power-down.
+                                          If False, settings are temporary. If None, uses reader default behavior.
+
+        Returns:
+            bool: True if configuration was successful, False otherwise.
+        """
+        if not pairs or len(pairs) % 2:
+            print("❌ Antenna power pairs must be a non-empty sequence of [antenna ID, power] bytes.")
+            return False
+
+        full_payload: bytes = bytes(pairs)
         # Add persistence parameter if specified
         if persistence is not None:
-            payload_parts.append(b'\xFF') # PID for Parameter persistence [Protocol Spec]
-            payload_parts.append((0x01 if persistence else 0x00).to_bytes(1, 'big')) # Value for persistence (0x01=save, 0x00=temporary)
-        
-        full_payload: bytes = b''.join(payload_parts)
+            # PID 0xFF for Parameter persistence [Protocol Spec]; value 0x01=save, 0x00=temporary
+            full_payload += b'\xFF\x01' if persistence else b'\xFF\x00'
 
         try:
             self.uart.flush_input() # Clear input buffer before sending
@@ -1102,7 +1159,7 @@ class NationReader:
         """
         return self._inventory_running
 
-    def start_inventory_with_mode(self, antenna_mask: List[int], callback: Optional[Callable[[Dict], None]] = None) -> bool:
+    def start_inventory_with_mode(self, antenna_mask: List[int], callback: Optional[Callable[[Dict], None]] = None, spawn_thread: bool = True) -> bool:
         """
         Initiates an RFID tag inventory operation with a specified antenna mask and an optional callback.
         It first attempts to stop any existing inventory to ensure a clean start.
@@ -1110,9 +1167,11 @@ class NationReader:
         Args:
             antenna_mask (list[int]): A list of 1-based antenna IDs to activate for inventory.
             callback (Optional[Callable[[Dict], None]]): A callable function to be invoked for each detected tag.
+            spawn_thread (bool): If True (default), start a background thread that reads and parses inventory data.
+                                 If False, the caller reads the serial port itself and passes the bytes to `feed_bytes`.
 
         Returns:
-            bool: True if the inventory command was sent successfully and the background thread started, False otherwise.
+            bool: True if the inventory command was sent successfully (and the background thread started), False otherwise.
         """
         try:
             # Ensure any previous inventory operation is stopped
@@ -1124,18 +1183,19 @@ class NationReader:
             self._inventory_running = True
             self._on_tag = callback # Callback for tag detections
             self._on_inventory_end = None # Reset end callback, if used separately
+            self._feed_buffer = b"" # Drop partial frames from a previous run
 
-            # Convert list of antenna IDs to a 32-bit bitmask
-            actual_antenna_mask: int = self.build_antenna_mask(antenna_mask)
-            print(f"🚀 Starting inventory with antenna mask: 0x{actual_antenna_mask:08X}")
-            
-            # Build the payload for the READ_EPC_TAG command (MID 0x0210)
-            # `continuous=True` indicates ongoing inventory until stopped
-            payload: bytes = self.build_epc_read_payload(actual_antenna_mask, continuous=True)
-            frame: bytes = self.build_frame(mid=MID.READ_EPC_TAG, payload=payload, rs485=self.rs485, notify=False)
+            # Start frame for this antenna set, built once and then reused (see `precomputed_inventory_frame`)
+            antenna_ids: Tuple[int, ...] = tuple(sorted(antenna_mask))
+            frame: bytes = self.precomputed_inventory_frame(antenna_ids, self.rs485)
+            print(f"🚀 Starting inventory on antennas: {list(antenna_ids)}")
             
             self.send(frame) # Send the inventory start command
 
+            if not spawn_thread:
+                print("✅ Inventory command sent (caller drains the serial port via feed_bytes).")
+                return True
+
             # Start a background thread to continuously receive and parse inventory data
             self._inventory_thread = threading.Thread(target=self._receive_inventory_loop_optimized, daemon=True)
             self._inventory_thread.start()
@@ -1149,6 +1209,24 @@ class NationReader:
             print(f"❌ An unexpected exception occurred in start_inventory_with_mode: {e}")
             return False
 
+    def wait_inventory(self, timeout: Optional[float] = None) -> bool:
+        """
+        Blocks until the inventory reception thread started by `start_inventory_with_mode` exits
+        (after `stop_inventory` or a 'read end' notification). Under eventlet/gevent monkey patching,
+        the join yields to other green threads.
+
+        Args:
+            timeout (Optional[float]): Maximum time to wait in seconds; None waits indefinitely.
+
+        Returns:
+            bool: True if no reception thread is running anymore, False if the timeout expired first.
+        """
+        thread: Optional[threading.Thread] = self._inventory_thread
+        if thread is None:
+            return True
+        thread.join(timeout)
+        return not thread.is_alive()
+
     def _receive_inventory_loop_optimized(self) -> None:
         """
         Optimized background loop for receiving and processing inventory data from the reader.
@@ -1169,48 +1247,14 @@ class NationReader:
                 
                 buffer += raw_data # Append new data to the buffer
                 
-                # Attempt to extract all valid frames from the current buffer
-                frames: List[bytes] = self.extract_valid_frames(buffer)
-                
-                if frames:
-                    # If valid frames were extracted, remove their bytes from the buffer
-                    # by finding the position right after the last extracted frame.
-                    last_frame: bytes = frames[-1]
-                    # This `find` might be inefficient for very large buffers or many small frames.
-                    # A more robust approach might be to track the total bytes consumed by frames.
-                    # For simplicity, keeping original logic.
-                    idx_of_last_frame_end: int = buffer.find(last_frame) + len(last_frame)
-                    buffer = buffer[idx_of_last_frame_end:]
-
-                for frame in frames:
-                    try:
-                        parsed_frame: Dict[str, Any] = self.parse_frame(frame)
-                        category: int = parsed_frame.get("category", -1)
-                        mid: int = parsed_frame.get("mid", -1)
-                        data_payload: bytes = parsed_frame.get("data", b"")
-
-                        if category == 0x10 or mid == 0x00: # Specific pattern for EPC tag data (Category 0x10, MID 0x00 for response)
-                            tag: Dict[str, Any] = self.parse_epc(data_payload)
-                            if "error" in tag:
-                                # print(f"⚠️ EPC parse error: {tag['error']}") # Often too noisy for continuous logging
-                                continue # Skip this tag if parsing failed
-                            else:
-                                if self._on_tag:
-                                    self._on_tag(tag) # Invoke the registered callback for the detected tag
-                        
-                        elif mid in NationReader.all_read_end_mids(): # Check for any 'read end' notification MIDs
-                            reason: Optional[int] = data_payload[0] if data_payload else None
-                            print(f"✅ Inventory ended. Reason code: {reason}.")
-                            if self._on_inventory_end:
-                                self._on_inventory_end(reason) # Invoke end callback if registered
-                            self._inventory_running = False # Signal loop to terminate
-                            return # Exit the loop and thread function
-                    except ValueError as ve:
-                        # print(f"⚠️ Frame parsing error in _receive_inventory_loop_optimized: {ve}. Skipping frame.")
-                        continue # Continue to next frame if current one caused parsing error
-                    except Exception as ex:
-                        # print(f"⚠️ An unexpected error occurred processing frame in inventory loop: {ex}. Skipping frame.")
-                        continue # Catch other unexpected errors but keep loop running
+                # Attempt to extract all valid frames from the current buffer, then drop their
+                # bytes by slicing at the end of the last one (a search for the frame bytes would
+                # stop at the first copy when the same tag is read twice in one chunk)
+                frames, end = self.extract_frames_with_end(buffer)
+                buffer = buffer[end:]
+
+                if self._dispatch_inventory_frames(frames):
+                    return # Inventory ended; exit the loop and thread function
             
             except serial.SerialException as se:
                 print(f"❌ Serial communication error in inventory loop: {se}. Attempting to recover or stop.")
@@ -1219,6 +1263,65 @@ class NationReader:
                 print(f"⚠️ An general error occurred in inventory loop: {e}. Waiting briefly.")
                 time.sleep(0.01) # Small pause on general error to prevent busy-waiting
 
+    def _dispatch_inventory_frames(self, frames: List[bytes]) -> bool:
+        """
+        Handles complete inventory frames: invokes `_on_tag` for each EPC tag frame and
+        `_on_inventory_end` for a 'read end' notification.
+
+        Args:
+            frames (list[bytes]): Complete frames as returned by `extract_valid_frames`.
+
+        Returns:
+            bool: True if a 'read end' notification was seen (inventory is over), False otherwise.
+        """
+        for frame in frames:
+            try:
+                parsed_frame: Dict[str, Any] = self.parse_frame(frame)
+                category: int = parsed_frame.get("category", -1)
+                mid: int = parsed_frame.get("mid", -1)
+                data_payload: bytes = parsed_frame.get("data", b"")
+
+                if category == 0x10 or mid == 0x00: # Specific pattern for EPC tag data (Category 0x10, MID 0x00 for response)
+                    tag: Dict[str, Any] = self.parse_epc(data_payload)
+                    if "error" in tag:
+                        # print(f"⚠️ EPC parse error: {tag['error']}") # Often too noisy for continuous logging
+                        continue # Skip this tag if parsing failed
+                    else:
+                        if self._on_tag:
+                            self._on_tag(tag) # Invoke the registered callback for the detected tag
+                
+                elif mid in NationReader.READ_END_MIDS: # Check for any 'read end' notification MIDs
+                    reason: Optional[int] = data_payload[0] if data_payload else None
+                    print(f"✅ Inventory ended. Reason code: {reason}.")
+                    if self._on_inventory_end:
+                        self._on_inventory_end(reason) # Invoke end callback if registered
+                    self._inventory_running = False # Signal loop to terminate
+                    return True
+            except ValueError as ve:
+                # print(f"⚠️ Frame parsing error in _dispatch_inventory_frames: {ve}. Skipping frame.")
+                continue # Continue to next frame if current one caused parsing error
+            except Exception as ex:
+                # print(f"⚠️ An unexpected error occurred processing frame in inventory loop: {ex}. Skipping frame.")
+                continue # Catch other unexpected errors but keep loop running
+        return False
+
+    def feed_bytes(self, data: bytes) -> bool:
+        """
+        Parses inventory data read by the caller (see `start_inventory_with_mode(spawn_thread=False)`).
+        Partial frames are kept until the next call.
+
+        Args:
+            data (bytes): Raw bytes read from the serial port (bytes, bytearray or memoryview).
+
+        Returns:
+            bool: True if the inventory has ended (a 'read end' notification was seen), False otherwise.
+        """
+        buffer: bytes = self._feed_buffer + bytes(data)
+        frames, end = self.extract_frames_with_end(buffer)
+        # Same trimming as `_receive_inventory_loop_optimized`: keep bytes after the last frame
+        self._feed_buffer = buffer[end:]
+        return self._dispatch_inventory_frames(frames)
+
     # This method seems to be an older/alternative inventory loop, not used by start_inventory_with_mode.
     # Included for refactoring as per instructions.
     def _receive_inventory_loop(self) -> None:
@@ -1362,6 +1465,28 @@ class NationReader:
         print("❌ STOP failed: No valid response or reading end notification received after multiple attempts.")
         return False
 
+    @classmethod
+    @functools.lru_cache(maxsize=32)
+    def precomputed_inventory_frame(cls, antenna_ids: Tuple[int, ...], rs485: bool = False) -> bytes:
+        """
+        Returns the continuous READ_EPC_TAG start frame (MID 0x0210) for a set of antennas.
+        Frames are cached per (antenna tuple, rs485), so repeated start/stop cycles reuse the same bytes;
+        callers should pass a sorted tuple so equivalent antenna lists share one cache entry.
+
+        Args:
+            antenna_ids (tuple[int, ...]): Sorted 1-based antenna IDs to activate.
+            rs485 (bool): True if RS485 mode is active.
+
+        Returns:
+            bytes: The complete command frame.
+
+        Raises:
+            ValueError: If any antenna ID is outside the valid range (1-32).
+        """
+        # `continuous=True` indicates ongoing inventory until stopped
+        payload: bytes = cls.build_epc_read_payload(cls.build_antenna_mask(antenna_ids), continuous=True)
+        return cls.build_frame(mid=MID.READ_EPC_TAG, payload=payload, rs485=rs485, notify=False)
+
     @staticmethod
     def all_read_end_mids() -> List[int]:
         """
@@ -1615,18 +1740,17 @@ class NationReader:
 
             # Step 1 (revisited): Format the new EPC content for writing.
             # This involves calculating the PC word based on EPC length and padding.
-            epc_hex_formatted: str = new_epc_hex.strip().upper()
+            # `bytes.fromhex` accepts either case, so the hex is not upper-cased first.
+            epc_hex_formatted: str = new_epc_hex.strip()
             # Calculate word length: each word is 2 bytes or 4 hex characters.
             # `(len(epc_hex_formatted) + 3) // 4` ensures correct word count, rounding up.
             word_len: int = (len(epc_hex_formatted) + 3) // 4 
             # PC word bits: bits 11-15 typically represent the EPC word length.
             pc_bits: int = word_len << 11 
-            pc_hex: str = f"{pc_bits:04X}" # Format PC bits as 4 hex characters
             
-            # Combine PC hex with EPC hex, padding the EPC with '0's to align to word length.
-            # Ensures the final hex string has a length divisible by 4 (for byte pairs).
-            full_epc_hex: str = pc_hex + epc_hex_formatted.ljust(word_len * 4, '0')
-            epc_bytes_to_write: bytes = bytes.fromhex(full_epc_hex)
+            # PC word as 2 raw bytes, followed by the EPC padded with '0's to the word length.
+            # A single `bytes.fromhex` call converts the EPC; the PC word never goes through hex.
+            epc_bytes_to_write: bytes = pc_bits.to_bytes(2, "big") + bytes.fromhex(epc_hex_formatted.ljust(word_len * 4, '0'))
 
             # Step 2: Build the payload for the write operation.
             payload: bytearray = bytearray()
@@ -1644,8 +1768,7 @@ class NationReader:
 
             # Step 3: Add optional match EPC filter if provided.
             if match_epc_hex:
-                match_hex_formatted: str = match_epc_hex.strip().upper()
-                match_bytes: bytes = bytes.fromhex(match_hex_formatted)
+                match_bytes: bytes = bytes.fromhex(match_epc_hex.strip())
                 bit_len: int = len(match_bytes) * 8 # Length in bits for match
                 
                 # Match content format: [Area][Start_Address][Bit_Length][Data]
@@ -1969,6 +2092,25 @@ class NationReader:
             print("Cleanup: Ensuring reader is idle.")
         return result
 
+    @staticmethod
+    def is_hex_string(value: str) -> bool:
+        """
+        Checks that a string contains only hexadecimal digits, without touching the reader.
+        `bytes.translate` deletes every hex digit in a single C-level table-lookup pass;
+        anything left over is an invalid character. An empty string counts as valid.
+
+        Args:
+            value (str): The string to check (e.g., an EPC hex string).
+
+        Returns:
+            bool: True if every character is 0-9, a-f or A-F, False otherwise.
+        """
+        try:
+            raw: bytes = value.encode("ascii")
+        except UnicodeEncodeError:
+            return False # Non-ASCII characters can never be hex digits
+        return not raw.translate(None, HEX_DIGITS)
+
     @staticmethod    
     def validate_epc_hex(epc_hex: str) -> bytes:
         """
@@ -1988,7 +2130,7 @@ class NationReader:
         epc_hex = epc_hex.strip().replace(" ", "") # Remove whitespace
         
         # Check if all characters are valid hexadecimal digits
-        if not all(c in "0123456789abcdefABCDEF" for c in epc_hex):
+        if not NationReader.is_hex_string(epc_hex):
             raise ValueError("EPC hex contains non-hex characters.")
         
         # Ensure an even number of hex digits (each byte requires 2 hex chars)
@@ -2122,36 +2264,21 @@ class NationReader:
 
         return antenna_power_list
     
-    def enable_ant(self, ant_id: int, save: bool = True) -> bool:
+    def set_antenna_mask(self, mask: int, save: bool = True) -> bool:
         """
-        Enables a single antenna port on the reader.
-        Updates the global antenna mask and optionally saves the configuration to non-volatile memory.
+        Writes the full enabled-antenna mask in a single command (MID 0x0203).
+        Bit N-1 of the mask enables antenna N; antennas whose bit is clear are disabled.
 
         Args:
-            ant_id (int): The 1-based ID of the antenna to enable (1-32).
+            mask (int): The 32-bit enabled-antenna mask.
             save (bool): If True, attempts to save the configuration (default: True).
 
         Returns:
-            bool: True if the antenna was successfully enabled, False otherwise.
+            bool: True if the reader acknowledged the new mask, False otherwise.
         """
-        if not (1 <= ant_id <= 32): # Validate antenna ID range
-            print(f"❌ Invalid antenna ID: {ant_id}. Must be between 1 and 32.")
-            return False
-        
         try:
-            # Query the current enabled antenna mask
-            current_mask: int = self.query_enabled_ant_mask()
-            # Calculate the new mask by setting the bit corresponding to ant_id
-            new_mask: int = current_mask | (1 << (ant_id - 1))
-            
-            # Build payload: 4 bytes for new_mask + optional 2 bytes for persistence flag
-            payload: bytes = new_mask.to_bytes(4, 'big')
-            if save: # If save is True, append the persistence PID and value
-                payload += b'\xFF' # PID for Parameter persistence (save configuration)
-                payload += (0x01).to_bytes(1, 'big') # Value 0x01 means save
-            else: # If save is False, append the persistence PID and value 0x00 (temporary)
-                payload += b'\xFF'
-                payload += (0x00).to_bytes(1, 'big')
+            # Build payload: 4 bytes for mask + 2 bytes for persistence flag (PID 0xFF, 0x01 save / 0x00 temporary)
+            payload: bytes = mask.to_bytes(4, 'big') + b'\xFF' + (b'\x01' if save else b'\x00')
 
             # Build and send the command frame (MID 0x0203 for antenna configuration)
             frame: bytes = self.build_frame(mid=0x0203, payload=payload, notify=False)
@@ -2160,7 +2287,7 @@ class NationReader:
             
             raw_response: bytes = self.uart.receive(64) # Receive response
             if not raw_response:
-                print(f"❌ No response received after sending enable antenna {ant_id} command.")
+                print(f"❌ No response received after sending antenna mask 0x{mask:08X}.")
                 return False
             
             parsed_response: Dict[str, Any] = self.parse_frame(raw_response)
@@ -2169,15 +2296,37 @@ class NationReader:
 
             # Expected response MID is 0x03 (low byte of 0x0203) and success code 0x00
             if mid_response == 0x03 and len(data_payload) > 0 and data_payload[0] == 0x00:
-                print(f"✅ Enabled antenna {ant_id} (new mask=0x{new_mask:08X}, save={save}).")
                 return True
-            else:
-                print(f"❌ Failed to enable antenna {ant_id}. Response MID: 0x{mid_response:02X}, Data: {data_payload.hex().upper()}.")
-                return False
+            print(f"❌ Failed to set antenna mask 0x{mask:08X}. Response MID: 0x{mid_response:02X}, Data: {data_payload.hex().upper()}.")
+            return False
         except Exception as e:
-            print(f"❌ Exception in enable_ant for ID {ant_id}: {e}")
+            print(f"❌ Exception in set_antenna_mask for mask 0x{mask:08X}: {e}")
             return False
 
+    def enable_ant(self, ant_id: int, save: bool = True) -> bool:
+        """
+        Enables a single antenna port on the reader.
+        Updates the global antenna mask and optionally saves the configuration to non-volatile memory.
+
+        Args:
+            ant_id (int): The 1-based ID of the antenna to enable (1-32).
+            save (bool): If True, attempts to save the configuration (default: True).
+
+        Returns:
+            bool: True if the antenna was successfully enabled, False otherwise.
+        """
+        if not (1 <= ant_id <= 32): # Validate antenna ID range
+            print(f"❌ Invalid antenna ID: {ant_id}. Must be between 1 and 32.")
+            return False
+        
+        # Calculate the new mask by setting the bit corresponding to ant_id
+        new_mask: int = self.query_enabled_ant_mask() | (1 << (ant_id - 1))
+        if self.set_antenna_mask(new_mask, save):
+            print(f"✅ Enabled antenna {ant_id} (new mask=0x{new_mask:08X}, save={save}).")
+            return True
+        print(f"❌ Failed to enable antenna {ant_id}.")
+        return False
+
     def disable_ant(self, ant_id: int, save: bool = True) -> bool:
         """
         Disables a single antenna port on the reader.
@@ -2194,47 +2343,16 @@ class NationReader:
             print(f"❌ Invalid antenna ID: {ant_id}. Must be between 1 and 32.")
             return False
         
-        try:
-            # Query the current enabled antenna mask
-            current_mask: int = self.query_enabled_ant_mask()
-            # Calculate the new mask by clearing the bit corresponding to ant_id
-            new_mask: int = current_mask & ~(1 << (ant_id - 1))
-            
-            # Build payload: 4 bytes for new_mask + optional 2 bytes for persistence flag
-            payload: bytes = new_mask.to_bytes(4, 'big')
-            if save: # If save is True, append the persistence PID and value
-                payload += b'\xFF' 
-                payload += (0x01).to_bytes(1, 'big') 
-            else: # If save is False, append the persistence PID and value 0x00 (temporary)
-                payload += b'\xFF'
-                payload += (0x00).to_bytes(1, 'big')
-
-            # Build and send the command frame (MID 0x0203 for antenna configuration)
-            frame: bytes = self.build_frame(mid=0x0203, payload=payload, notify=False)
-            self.uart.flush_input()
-            self.uart.send(frame)
-            
-            raw_response: bytes = self.uart.receive(64) # Receive response
-            if not raw_response:
-                print(f"❌ No response received after sending disable antenna {ant_id} command.")
-                return False
-            
-            parsed_response: Dict[str, Any] = self.parse_frame(raw_response)
-            mid_response: int = parsed_response.get("mid", -1)
-            data_payload: bytes = parsed_response.get("data", b"")
-
-            # Expected response MID is 0x03 (low byte of 0x0203) and success code 0x00
-            if mid_response == 0x03 and len(data_payload) > 0 and data_payload[0] == 0x00:
-                print(f"✅ Disabled antenna {ant_id} (new mask=0x{new_mask:08X}, save={save}).")
-                return True
-            else:
-                print(f"❌ Failed to disable antenna {ant_id}. Response MID: 0x{mid_response:02X}, Data: {data_payload.hex().upper()}.")
-                return False
-        except Exception as e:
-            print(f"❌ Exception in disable_ant for ID {ant_id}: {e}")
-            return False
+        # Calculate the new mask by clearing the bit corresponding to ant_id
+        new_mask: int = self.query_enabled_ant_mask() & ~(1 << (ant_id - 1))
+        if self.set_antenna_mask(new_mask, save):
+            print(f"✅ Disabled antenna {ant_id} (new mask=0x{new_mask:08X}, save={save}).")
+            return True
+        print(f"❌ Failed to disable antenna {ant_id}.")
+        return False
 
-    def build_antenna_mask(self, antenna_ids: List[int]) -> int:
+    @staticmethod
+    def build_antenna_mask(antenna_ids: List[int]) -> int:
         """
         Converts a list of 1-based antenna IDs into a single 32-bit antenna mask.
 
@@ -2254,6 +2372,28 @@ class NationReader:
             mask |= (1 << (ant_id - 1)) # Set the corresponding bit
         return mask
 
+    @staticmethod
+    def antenna_ids_from_mask(mask: int, max_antennas: int = 64) -> List[int]:
+        """
+        Converts an antenna mask back into a sorted list of 1-based antenna IDs
+        (the inverse of `build_antenna_mask`). Bits above `max_antennas` are ignored.
+        Iterates once per set bit (lowest first) rather than once per possible antenna.
+
+        Args:
+            mask (int): The antenna bitmask (bit 0 = antenna 1).
+            max_antennas (int): Number of low bits to consider (default: 64).
+
+        Returns:
+            list[int]: The 1-based IDs of the set bits, ascending.
+        """
+        mask &= (1 << max_antennas) - 1
+        antenna_ids: List[int] = []
+        while mask:
+            lowest_bit: int = mask & -mask # Isolate the lowest set bit
+            antenna_ids.append(lowest_bit.bit_length()) # Bit position + 1 = antenna ID
+            mask ^= lowest_bit # Clear it
+        return antenna_ids
+
     # --- Profile Management Methods ---
 
     def select_profile(self, profile_id: int) -> bool:
@@ -2267,16 +2407,34 @@ class NationReader:
         Returns:
             bool: True if the profile was successfully selected, False otherwise.
         """
-        if profile_id not in (0, 1, 2): # Validate profile ID range
+        if profile_id not in self.PROFILE_IDS: # Validate profile ID range
             print(f"❌ Invalid profile ID: {profile_id}. Must be 0, 1, or 2.")
             return False
 
+        return self.send_select_profile_frame(self.build_select_profile_frame(profile_id, rs485=self.rs485), profile_id)
+
+    @classmethod
+    def build_select_profile_frame(cls, profile_id: int, rs485: bool = False) -> bytes:
+        """
+        Builds the Select Baseband Profile command frame (MID 0x020A) without sending it.
+        Pure function of its arguments (no validation), so callers can precompute frames.
+
+        Returns:
+            bytes: The complete command frame.
+        """
+        # Payload is simply the profile ID byte
+        return cls.build_frame(mid=0x020A, payload=bytes([profile_id]), rs485=rs485, notify=False)
+
+    def send_select_profile_frame(self, frame: bytes, profile_id: int) -> bool:
+        """
+        Sends a prebuilt Select Baseband Profile frame (see `build_select_profile_frame`)
+        and checks that the reader acknowledged `profile_id`.
+
+        Returns:
+            bool: True if the profile was successfully selected, False otherwise.
+        """
         try:
             self.uart.flush_input() # Clear input buffer
-            payload: bytes = bytes([profile_id]) # Payload is simply the profile ID byte
-            
-            # Build and send the command frame (MID 0x020A for Select Baseband Profile)
-            frame: bytes = self.build_frame(mid=0x020A, payload=payload, rs485=self.rs485, notify=False)
             self.uart.send(frame)
 
             time.sleep(0.1) # Short delay for response
@@ -2321,10 +2479,8 @@ class NationReader:
         try:
             # 1. Enabled Antennas
             enabled_mask: int = self.query_enabled_ant_mask()
-            # Construct a list of 1-based antenna IDs from the mask
-            # The range should ideally be up to MAX_ANTENNAS from a config, or 32/64 as per reader.
-            # Using 65 as in original code, implying max 64 antennas.
-            profile["enabled_antennas"] = [i for i in range(1, 65) if (enabled_mask >> (i - 1)) & 1]
+            # Construct a list of 1-based antenna IDs from the mask (up to 64 antennas, as per reader)
+            profile["enabled_antennas"] = self.antenna_ids_from_mask(enabled_mask)
 
             # 2. Antenna Powers
             powers: Dict[int, int] = self.query_reader_power()
@@ -2894,19 +3050,61 @@ class NationReader:
             bool: True if baseband configuration was successful, False otherwise.
         """
         # --- Step 1: Validate Input Parameters ---
-        if speed not in (0, 1, 2, 3, 4, 255):
-            print(f"❌ Invalid speed parameter: {speed}. Must be 0, 1, 2, 3, 4, or 255.")
+        error: Optional[str] = self.baseband_params_error(speed, q_value, session, inventory_flag)
+        if error:
+            print(f"❌ {error}")
             return False
+
+        return self.send_baseband_frame(self.build_baseband_frame(speed, q_value, session, inventory_flag))
+
+    @staticmethod
+    def baseband_params_error(speed: int, q_value: int, session: int, inventory_flag: int) -> Optional[str]:
+        """
+        Validates CONFIG_BASEBAND parameters (the checks of `configure_baseband`) without sending anything.
+
+        Returns:
+            Optional[str]: A description of the first invalid parameter, or None if all are valid.
+        """
+        if speed not in (0, 1, 2, 3, 4, 255):
+            return f"Invalid speed parameter: {speed}. Must be 0, 1, 2, 3, 4, or 255."
         if not (0 <= q_value <= 15):
-            print(f"❌ Invalid Q value: {q_value}. Must be between 0 and 15.")
-            return False
+            return f"Invalid Q value: {q_value}. Must be between 0 and 15."
         if session not in (0, 1, 2, 3):
-            print(f"❌ Invalid session: {session}. Must be 0, 1, 2, or 3.")
-            return False
+            return f"Invalid session: {session}. Must be 0, 1, 2, or 3."
         if inventory_flag not in (0, 1, 2):
-            print(f"❌ Invalid inventory flag: {inventory_flag}. Must be 0, 1, or 2.")
-            return False
+            return f"Invalid inventory flag: {inventory_flag}. Must be 0, 1, or 2."
+        return None
+
+    @classmethod
+    def build_baseband_frame(cls, speed: int, q_value: int, session: int, inventory_flag: int) -> bytes:
+        """
+        Builds the CONFIG_BASEBAND command frame for the given parameters without sending it.
+        Pure function of its arguments (no validation), so callers can precompute frames.
+
+        Returns:
+            bytes: The complete CONFIG_BASEBAND frame.
+        """
+        # Each parameter (speed, q, session, flag) is sent as a Type (PID) and Value (1 byte).
+        payload: bytes = bytes([
+            0x01, speed,         # PID 0x01 for Speed
+            0x02, q_value,       # PID 0x02 for Q Value
+            0x03, session,       # PID 0x03 for Session
+            0x04, inventory_flag # PID 0x04 for Inventory Flag
+        ])
+        # Use MID.CONFIG_BASEBAND (0x020B) for baseband configuration.
+        return cls.build_frame(mid=MID.CONFIG_BASEBAND, payload=payload, rs485=False, notify=False)
+
+    def send_baseband_frame(self, frame: bytes) -> bool:
+        """
+        Sends a prebuilt CONFIG_BASEBAND frame (see `build_baseband_frame`) and checks the reply.
+        The reader is stopped and must be idle before the frame is sent.
+
+        Args:
+            frame (bytes): The complete CONFIG_BASEBAND frame.
 
+        Returns:
+            bool: True if baseband configuration was successful, False otherwise.
+        """
         try:
             # --- Step 2: Ensure Reader is Idle ---
             # It's crucial that the reader is not performing other operations before configuration.
@@ -2919,18 +3117,7 @@ class NationReader:
             time.sleep(0.1) # Small delay for stability
             self.uart.flush_input() # Clear any residual data
 
-            # --- Step 3: Encode TLV Payload for Baseband Configuration ---
-            # Each parameter (speed, q, session, flag) is sent as a Type (PID) and Value (1 byte).
-            payload: bytes = bytes([
-                0x01, speed,         # PID 0x01 for Speed
-                0x02, q_value,       # PID 0x02 for Q Value
-                0x03, session,       # PID 0x03 for Session
-                0x04, inventory_flag # PID 0x04 for Inventory Flag
-            ])
-
-            # --- Step 4: Build Command Frame ---
-            # Use MID.CONFIG_BASEBAND (0x020B) for baseband configuration.
-            frame: bytes = self.build_frame(mid=MID.CONFIG_BASEBAND, payload=payload, rs485=False, notify=False)
+            # --- Steps 3-4: Frame is prebuilt by `build_baseband_frame` ---
             print(f"📤 Sending baseband configuration frame: {frame.hex().upper()}")
 
             # --- Step 5: Send Frame to Reader ---
@@ -2990,7 +3177,7 @@ class NationReader:
             print(f"❌ Data validation/parsing error during baseband configuration: {ve}")
             return False
         except Exception as e:
-            print(f"❌ An unexpected exception occurred during configure_baseband: {e}")
+            print(f"❌ An unexpected exception occurred during send_baseband_frame: {e}")
             return False
 
     def query_baseband_profile(self) -> Dict[str, Any]: